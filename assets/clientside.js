@@ -0,0 +1,105 @@
+/*
+    Clientside callbacks - these run in the browser without a trip to the
+    server.  Dash loads every file in assets/ on its own.
+*/
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    clientside: {
+        // The browser window's width in pixels
+        width: function (pathname) {
+            return window.innerWidth;
+        },
+
+        // Keep track of the charts that have been scrolled into view.
+        // Called with the poll count, what makes up the view (the page's
+        // dates first, then the system...) and the current value.
+        // seen holds every chart shown since the view last changed and new
+        // the ones that just came into view, which the server draws next.
+        visible: function (poll) {
+            var args = Array.prototype.slice.call(arguments, 1);
+            var current = args.pop();
+            var dates = args[0];
+            var view = JSON.stringify(args);
+            var margin = window.innerHeight / 2;
+            var shown = [];
+            document.querySelectorAll("#page-content .dash-graph").forEach(
+                function (graph) {
+                    var box = graph.getBoundingClientRect();
+                    if (
+                        box.bottom > -margin &&
+                        box.top < window.innerHeight + margin
+                    ) {
+                        shown.push(graph.id);
+                    }
+                }
+            );
+
+            if (!dates) {
+                return window.dash_clientside.no_update;
+            }
+            if (!current || current.view !== view) {
+                return {view: view, seen: shown, new: shown};
+            }
+
+            var fresh = shown.filter(function (id) {
+                return current.seen.indexOf(id) < 0;
+            });
+            if (!fresh.length) {
+                return window.dash_clientside.no_update;
+            }
+
+            return {view: view, seen: current.seen.concat(fresh), new: fresh};
+        },
+
+        // Turn a packed figure (see cf.pack_figure) back into a plain one.
+        // Traces with a number for x are drawn at that entry of the
+        // figure's times: a start in milliseconds and either a step and a
+        // count or each point's offset, both in seconds.
+        unpack: function (figure) {
+            if (!figure) {
+                return window.dash_clientside.no_update;
+            }
+            if (!figure.times) {
+                return figure;
+            }
+
+            var times = figure.times.map(function (packed) {
+                var offsets = packed.offsets;
+                if (!offsets) {
+                    offsets = [];
+                    for (var i = 0; i < packed.count; i++) {
+                        offsets.push(i * packed.step);
+                    }
+                }
+                return offsets.map(function (offset) {
+                    return packed.start + offset * 1000;
+                });
+            });
+            var data = figure.data.map(function (trace) {
+                if (typeof trace.x !== "number") {
+                    return trace;
+                }
+                return Object.assign({}, trace, {x: times[trace.x]});
+            });
+
+            return {data: data, layout: figure.layout};
+        },
+
+        // Show one system's figure from a bundle of every system's (see
+        // cf.system_figures), putting back the layout they share
+        system: function (bundle, system) {
+            if (!bundle) {
+                return window.dash_clientside.no_update;
+            }
+            var figure = bundle.figures[system];
+            if (!figure) {
+                return {data: [], layout: bundle.layout};
+            }
+
+            return window.dash_clientside.clientside.unpack({
+                data: figure.data,
+                layout: Object.assign({}, bundle.layout, figure.layout),
+                times: figure.times,
+            });
+        },
+    },
+});
@@ -4,102 +4,302 @@
     the main application and displayed.
 """
 
+import math
 import pandas as pd
 import numpy as np
 import utility_functions as uf
 import layout_configs as lc
 import plotly.graph_objects as go
 import plotly.io as pio
-import plotly.express as px
 
 pd.options.plotting.backend = "plotly"
 pio.templates.default = "plotly_dark"
 
+#############################################################################
+# Downsampling
+#############################################################################
+# Sending every point of a busy day (or many systems) makes for a huge
+# figure and a frozen browser tab.  Each trace is cut down to
+# lc.max_trace_points by keeping the lowest and highest value in each
+# bucket of points, so peaks and dips always survive.  Zooming in on a
+# chart asks for the figure again with just that window (see xrange).
+
+
+# Pick which points of a series to draw, min and max per bucket
+def minmax_indices(values, max_points):
+    count = len(values)
+    if max_points is None or count <= max_points:
+        return np.arange(count)
+
+    buckets = max(max_points // 2, 1)
+    size = math.ceil(count / buckets)
+    buckets = math.ceil(count / size)
+
+    padded = np.full(buckets * size, np.nan)
+    padded[:count] = values
+    padded = padded.reshape(buckets, size)
+    missing = np.isnan(padded)
+    low = np.where(missing, np.inf, padded).argmin(axis=1)
+    high = np.where(missing, -np.inf, padded).argmax(axis=1)
+
+    start = np.arange(buckets) * size
+    indices = np.concatenate([start + low, start + high, [0, count - 1]])
+    indices = np.unique(indices)
+
+    return indices[indices < count]
+
+
+# Cut a frame down for drawing, keeping the same points for all columns
+# of a trace so stacked areas still line up
+def downsample_frame(df, columns, max_points, by=None):
+    if max_points is None or len(df) <= max_points:
+        return df
+
+    groups = [df] if by is None else [i for _, i in df.groupby(by, sort=False)]
+    per_column = max(max_points // len(columns), 2)
+
+    keep = []
+    for group in groups:
+        indices = [
+            minmax_indices(group[i].to_numpy(dtype=np.float64), per_column)
+            for i in columns
+        ]
+        keep.append(group.index.to_numpy()[np.unique(np.concatenate(indices))])
+
+    if not keep:
+        return df
+
+    return df.loc[np.concatenate(keep)]
+
+
+# Keep only the rows inside a zoomed x range
+def zoom_frame(df, xrange):
+    if xrange is None:
+        return df
+
+    start, end = pd.Timestamp(xrange[0]), pd.Timestamp(xrange[1])
+    stamps = pd.to_datetime(df["datetime"])
+    return df.loc[(stamps >= start) & (stamps <= end)]
+
+
+#############################################################################
+# Figure parts
+#############################################################################
+# Figures are put together in one go: the traces, shapes and annotations
+# are built as lists and handed to go.Figure together.  Adding them one at a
+# time (add_traces, add_vline, add_annotation) re-validates the figure on
+# every call, which adds up with many systems and restarts.
+
+# The CPU columns are stacked, everything else is filled to zero
+stacked_columns = {
+    "%usr",
+    "%nice",
+    "%sys",
+    "%iowait",
+    "%steal",
+    "%irq",
+    "%soft",
+    "%guest",
+    "%gnice",
+    "%idle",
+}
+
+label_columns = ["datetime", "CPU", "system", "DEV", "IFACE", "TTY"]
+
+
+# Times as an array for the traces.  Plotly checks a datetime Series point
+# by point, and sar only records whole seconds, which keeps the JSON short.
+def time_axis(column):
+    return column.to_numpy().astype("datetime64[s]")
+
+
+# SVG bogs the browser down past some thousands of points, so bigger
+# figures are drawn with WebGL (Scattergl) instead
+def scatter_type(points):
+    if lc.webgl_points is not None and points > lc.webgl_points:
+        return go.Scattergl
+
+    return go.Scatter
+
+
+# Scattergl can't stack areas, so the stacked columns are added up here:
+# each is drawn at the running total and filled down to the one before it,
+# with the hover showing the column's own value
+def stacked_areas(df, columns):
+    values = np.nan_to_num(df[columns].to_numpy(dtype=np.float64))
+    totals = values.cumsum(axis=1)
+    areas = {}
+    for n, name in enumerate(columns):
+        areas[name] = dict(
+            y=rounded(totals[:, n], name),
+            fill="tozeroy" if n == 0 else "tonexty",
+            customdata=rounded(values[:, n], name),
+            hovertemplate="%{customdata}",
+        )
+
+    return areas
+
+
+# Decimals kept for a column in compact figures
+def decimals(name):
+    for prefix, places in lc.value_decimals.items():
+        if str(name).startswith(prefix):
+            return places
+
+    return lc.default_decimals
+
+
+# Values for a trace, rounded for compact figures.  Whole numbers are sent
+# as integers when nothing is missing.
+def rounded(values, name):
+    values = np.asarray(values)
+    if not lc.compact_figures or values.dtype.kind != "f":
+        return values
+
+    places = decimals(name)
+    values = np.round(values, places)
+    if places == 0 and not np.isnan(values).any():
+        return values.astype(np.int64)
+
+    return values
+
+
+# A dashed line where each restart happened, with the system's name on it
+# Only the one system's restarts when system_name is given
+def reboot_markers(reboot_df, system_name=None):
+    if system_name is not None:
+        reboot_df = reboot_df.loc[reboot_df["system"] == system_name]
+
+    shapes = []
+    annotations = []
+    for stamp, system in zip(reboot_df["datetime"], reboot_df["system"]):
+        shapes.append(
+            dict(
+                type="line",
+                xref="x",
+                yref="paper",
+                x0=stamp,
+                x1=stamp,
+                y0=0,
+                y1=1,
+                line=dict(width=3, dash="dash", color="aqua"),
+            )
+        )
+        annotations.append(
+            dict(
+                text="Rebooted System: " + str(system),
+                xref="x",
+                yref="paper",
+                x=stamp,
+                y=0.95,
+                showarrow=False,
+            )
+        )
+
+    return shapes, annotations
+
+
+# The figure, its reboot markers and the usual chart settings all at once
+def build_figure(traces, layout, reboot_df, system_name=None, **settings):
+    shapes, annotations = reboot_markers(reboot_df, system_name)
+    settings = dict(dict(xaxis_title="", yaxis_title=""), **settings)
+    fig = go.Figure(data=traces, layout=layout)
+    fig.update_layout(
+        shapes=shapes,
+        annotations=annotations,
+        newshape=dict(line_color="yellow"),
+        **settings,
+    )
+
+    return fig
+
+
+# One line per system, or per system and group (CPU, DEV...) with each
+# system's lines sharing a colour and a legend entry
+def system_lines(df, param, group=None):
+    scatter = scatter_type(len(df))
+    colorway = pio.templates[pio.templates.default].layout.colorway
+    colors = {}
+    traces = []
+    by = "system" if group is None else ["system", group]
+    for name, rows in df.groupby(by, sort=False, observed=True):
+        system = name if group is None else name[0]
+        system = system[0] if isinstance(system, tuple) else system
+        first = system not in colors
+        if first:
+            colors[system] = colorway[len(colors) % len(colorway)]
+        traces.append(
+            scatter(
+                x=time_axis(rows["datetime"]),
+                y=rounded(rows[param].to_numpy(), param),
+                name=str(system),
+                legendgroup=str(system),
+                showlegend=first,
+                mode="lines",
+                line_color=colors[system],
+            )
+        )
+
+    return traces
+
+
 #############################################################################
 # Charts
 #############################################################################
 # template chart to display the raw data in comparison - one system
-def monitoring_line_chart(df, system_name, title_text, display, reboot_df):
+def monitoring_line_chart(
+    df, system_name, title_text, display, reboot_df, xrange=None, max_points=None
+):
     """
     df: the dataframe holding the section data
     system_name:  The specific system to detail from the configured list
     title_text: the title of the chart
     display: output a chart directly or not - useful for debugging
     reboot_df:  dataframe holding reboot data
+    xrange: [start, end] of a zoomed in view, None for everything
+    max_points: most points to draw per trace, defaults to lc.max_trace_points
     """
+    if max_points is None:
+        max_points = lc.max_trace_points
+
     # Create a new dataframe for just the system requested
     df1 = df.loc[df["system"] == system_name].copy()
-
-    # Get list of column names since we know nothing about the dataframe
-    column_names = df1.columns.values.tolist()
     df1 = uf.set_types(df1)
 
-    fig = go.Figure(layout=lc.layout_simple)
+    # Only draw what fits on the screen
+    value_columns = [i for i in df1.columns if i not in label_columns]
+    df1 = zoom_frame(df1, xrange)
+    df1 = downsample_frame(df1, value_columns, max_points)
 
     # Create a trace for all relevant data columns
-    for i in column_names[1:]:
-        # Skip label columns
-        if i == "CPU" or i == "system" or i == "DEV" or i == "IFACE" or i == "TTY":
-            continue
+    # I wanted something a bit different for CPU charting which is
+    # a stacked group of values.  The stacked ones go first so they fill
+    # down to each other when they're stacked here for WebGL.
+    scatter = scatter_type(len(df1) * len(value_columns))
+    stacked = [i for i in value_columns if i in stacked_columns]
+    others = [i for i in value_columns if i not in stacked_columns]
+    if scatter is go.Scatter:
+        areas = {i: dict(y=rounded(df1[i], i), stackgroup="one") for i in stacked}
+    else:
+        areas = stacked_areas(df1, stacked)
 
-        # I wanted something a bit different for CPU charting which is
-        # a stacked group of values.
-        if (
-            i == "CPU"
-            or i == "%usr"
-            or i == "%nice"
-            or i == "%sys"
-            or i == "%iowait"
-            or i == "%steal"
-            or i == "%irq"
-            or i == "%soft"
-            or i == "%guest"
-            or i == "%gnice"
-            or i == "%idle"
-        ):
-            fig.add_traces(
-                go.Scatter(
-                    x=df1.datetime,
-                    y=df1[i],
-                    name=i,
-                    line_width=2,
-                    stackgroup="one",
-                )
-            )
-        else:
-            fig.add_traces(
-                go.Scatter(
-                    x=df1.datetime,
-                    y=df1[i],
-                    name=i,
-                    line_width=2,
-                    fill="tozeroy",
-                )
-            )
+    stamps = time_axis(df1["datetime"])
+    traces = []
+    for i in stacked + others:
+        trace = areas.get(i, dict(y=rounded(df1[i], i), fill="tozeroy"))
+        traces.append(scatter(x=stamps, name=i, line_width=2, **trace))
 
-    # Mark where the reboot - if any occurred
-    for row in reboot_df.iterrows():
-        fig.add_vline(
-            x=row[0],
-            line_width=3,
-            line_dash="dash",
-            line_color="aqua",
-        )
-        fig.add_annotation(
-            text="Rebooted System: " + row[3],
-            xref="paper",
-            yref="paper",
-            x=0.5,
-            y=0.95,
-            showarrow=False,
-        )
-    # create the labels for the chart and set the drawing color
-    fig.update_layout(
-        newshape=dict(line_color="yellow"),
-        title=title_text + ": " + df1.iloc[0].system,
-        xaxis_title="",
-        yaxis_title="",
+    # uirevision keeps the zoom in place when the chart is refreshed
+    fig = build_figure(
+        traces,
+        lc.layout_simple,
+        reboot_df,
+        system_name,
+        title=title_text + ": " + system_name,
+        uirevision=system_name,
     )
+    if xrange is not None:
+        fig.update_xaxes(range=xrange)
 
     if display == 1:
         fig.show(config=lc.tool_config)
@@ -108,48 +308,37 @@ def monitoring_line_chart(df, system_name, title_text, display, reboot_df):
 
 
 # Function to compare multiple systems on a section and a parameter
-def comparison_line_chart(df, param, title_text, display, reboot_df):
+def comparison_line_chart(
+    df, param, title_text, display, reboot_df, xrange=None, max_points=None
+):
     """
     df: the dataframe holding the section data
     param: the dataframe column(s) to be displayed
     title_text: the title of the chart
     display: output a chart directly or not - useful for debugging
     reboot_df:  dataframe holding reboot data
+    xrange: [start, end] of a zoomed in view, None for everything
+    max_points: most points to draw per trace, defaults to lc.max_trace_points
 
     This function is not so effective with packed sections like BLOCK, NETWORK, TTY
     CPU is an exception because the collector pulls the aggregate
     """
-    df = uf.set_types(df)
+    if max_points is None:
+        max_points = lc.max_trace_points
 
-    fig = px.line(
-        df,
-        x="datetime",
-        y=param,
-        color="system",
-    )
+    df = uf.set_types(df)
+    df = zoom_frame(df, xrange)
+    df = downsample_frame(df, [param], max_points, by="system")
 
-    # Mark where the reboot - if any occurred
-    for index, row in reboot_df.iterrows():
-        fig.add_vline(
-            x=row[0],
-            line_width=3,
-            line_dash="dash",
-            line_color="aqua",
-        )
-        fig.add_annotation(
-            text="Rebooted System: " + row[3],
-            xref="paper",
-            yref="paper",
-            x=0.5,
-            y=0.95,
-            showarrow=False,
-        )
-    fig.update_layout(
-        newshape=dict(line_color="yellow"),
+    fig = build_figure(
+        system_lines(df, param),
+        go.Layout(template=pio.templates.default),
+        reboot_df,
         title=title_text + ": " + param,
-        xaxis_title="",
-        yaxis_title="",
+        legend_title_text="system",
     )
+    if xrange is not None:
+        fig.update_xaxes(range=xrange)
 
     if display == 1:
         fig.show(config=lc.tool_config)
@@ -159,49 +348,122 @@ def comparison_line_chart(df, param, title_text, display, reboot_df):
 
 # Function to compare multiple systems on a section and a parameter grouped
 # by secondary differentiator
-def comparison_grouped_line_chart(df, param, group, title_text, display, reboot_df):
+def comparison_grouped_line_chart(
+    df, param, group, title_text, display, reboot_df, xrange=None, max_points=None
+):
     """
     df: the dataframe holding the section data
     param: the dataframe column(s) to be displayed
     title_text: the title of the chart
     display: output a chart directly or not - useful for debugging
     reboot_df:  dataframe holding reboot data
+    xrange: [start, end] of a zoomed in view, None for everything
+    max_points: most points to draw per trace, defaults to lc.max_trace_points
 
     This function is not so effective with packed sections like BLOCK, NETWORK, TTY
     CPU is an exception because the collector pulls the aggregate
     """
+    if max_points is None:
+        max_points = lc.max_trace_points
+
     df = uf.set_types(df)
+    df = zoom_frame(df, xrange)
+    df = downsample_frame(df, [param], max_points, by=["system", group])
 
-    fig = px.line(
-        df,
-        x="datetime",
-        y=param,
-        line_group=group,
-        color="system",
+    fig = build_figure(
+        system_lines(df, param, group),
+        go.Layout(template=pio.templates.default),
+        reboot_df,
+        title=title_text + ": " + param,
+        legend_title_text="system",
     )
+    if xrange is not None:
+        fig.update_xaxes(range=xrange)
 
-    # Mark where the reboot - if any occurred
-    for index, row in reboot_df.iterrows():
-        fig.add_vline(
-            x=row[0],
-            line_width=3,
-            line_dash="dash",
-            line_color="aqua",
-        )
-        fig.add_annotation(
-            text="Rebooted System: " + row[3],
-            xref="paper",
-            yref="paper",
-            x=0.5,
-            y=0.95,
-            showarrow=False,
+    if display == 1:
+        fig.show(config=lc.tool_config)
+
+    return fig
+
+
+# Heatmap of one column for every CPU (or device, interface...) of a system
+# One row per CPU and one column per time is far lighter to send and draw
+# than a trace per CPU.  Time is averaged down to max_points columns.
+def heatmap_chart(
+    df,
+    system_name,
+    param,
+    key,
+    title_text,
+    display,
+    reboot_df,
+    xrange=None,
+    max_points=None,
+):
+    """
+    df: the dataframe holding the section data, with every row kept
+    system_name:  The specific system to detail from the configured list
+    param: the dataframe column to be displayed
+    key: the identifier column (CPU, DEV, ...), one heatmap row per value
+    title_text: the title of the chart
+    display: output a chart directly or not - useful for debugging
+    reboot_df:  dataframe holding reboot data
+    xrange: [start, end] of a zoomed in view, None for everything
+    max_points: most time columns to draw, defaults to lc.max_trace_points
+    """
+    if max_points is None:
+        max_points = lc.max_trace_points
+
+    # The aggregate row has its own charts
+    df1 = df.loc[(df["system"] == system_name) & (df[key] != "all")]
+    df1 = zoom_frame(df1, xrange)
+
+    # Lay the values out as a grid of identifier by time
+    order = uf.sorted_keys(df1[key])
+    stamps, column = np.unique(time_axis(df1["datetime"]), return_inverse=True)
+    row = pd.Categorical(df1[key].astype(str), categories=order).codes
+    grid = np.full((len(order), len(stamps)), np.nan)
+    grid[row, column] = df1[param].to_numpy(dtype=np.float64)
+
+    # Average runs of columns together when there are too many
+    size = 1
+    if max_points is not None and len(stamps) > max_points:
+        size = math.ceil(len(stamps) / max_points)
+    if size > 1:
+        count = math.ceil(len(stamps) / size)
+        padded = np.full((len(order), count * size), np.nan)
+        padded[:, : len(stamps)] = grid
+        padded = padded.reshape(len(order), count, size)
+        seen = (~np.isnan(padded)).sum(axis=2)
+        total = np.nansum(padded, axis=2)
+        grid = np.where(seen > 0, total / np.maximum(seen, 1), np.nan)
+        stamps = stamps[::size]
+
+    traces = []
+    if len(order):
+        traces.append(
+            go.Heatmap(
+                x=stamps,
+                y=order,
+                z=rounded(grid, param),
+                colorscale="Viridis",
+                colorbar=dict(title=param),
+                hoverongaps=False,
+            )
         )
-    fig.update_layout(
-        newshape=dict(line_color="yellow"),
-        title=title_text + ": " + param,
-        xaxis_title="",
-        yaxis_title="",
+
+    fig = build_figure(
+        traces,
+        lc.layout_simple,
+        reboot_df,
+        system_name,
+        title=title_text + ": " + system_name + " " + param,
+        yaxis_title=key,
+        yaxis_type="category",
+        uirevision=system_name,
     )
+    if xrange is not None:
+        fig.update_xaxes(range=xrange)
 
     if display == 1:
         fig.show(config=lc.tool_config)
@@ -209,6 +471,87 @@ def comparison_grouped_line_chart(df, param, group, title_text, display, reboot_
     return fig
 
 
+#############################################################################
+# Packed figures
+#############################################################################
+# Every point's time written out as a date string makes up most of a
+# figure's JSON, and the traces of a chart are usually drawn at the same
+# times anyway.  A packed figure has a "times" list instead, each entry a
+# start (milliseconds since the epoch) and either a step and a count or the
+# offsets of each point (seconds), and traces carry the index of their times
+# in place of x.  The browser turns them back into plain figures.
+
+
+def pack_times(stamps):
+    seconds = stamps.astype("datetime64[s]").astype(np.int64)
+    start = int(seconds[0])
+    offsets = seconds - start
+    steps = np.diff(offsets)
+    if len(steps) and (steps == steps[0]).all():
+        return {"start": start * 1000, "step": int(steps[0]), "count": len(seconds)}
+
+    return {"start": start * 1000, "offsets": offsets}
+
+
+# A figure as a dict ready to send, packed if lc.compact_figures is set
+def pack_figure(fig):
+    fig = fig.to_plotly_json()
+    if not lc.compact_figures:
+        return fig
+
+    times = []
+    shared = {}
+    for trace in fig["data"]:
+        stamps = trace.get("x")
+        if not isinstance(stamps, np.ndarray) or stamps.dtype.kind != "M":
+            continue
+        if not len(stamps):
+            continue
+        key = stamps.tobytes()
+        if key not in shared:
+            shared[key] = len(times)
+            times.append(pack_times(stamps))
+        trace["x"] = shared[key]
+
+    # Times come back as numbers, which the axis would take as plain values
+    fig["layout"].setdefault("xaxis", {})["type"] = "date"
+    if times:
+        fig["times"] = times
+
+    return fig
+
+
+#############################################################################
+# Every system at once
+#############################################################################
+# The System View gets a chart's figure for every system in one go and the
+# browser shows the one picked (see assets/clientside.js), so switching
+# systems doesn't ask the server for anything.  The figures differ only in
+# their traces, title and restart markers, so the rest of the layout is
+# sent once for all of them.
+
+# Layout settings that belong to one system's figure
+system_layout = ["title", "shapes", "annotations", "uirevision"]
+
+
+# chart(df, system, *args) for every system, as a bundle of
+# {"layout": shared layout, "figures": {system: {"data", "layout", "times"}}}
+# with each system's figure packed (see pack_figure)
+def system_figures(systems, chart, df, *args):
+    parts = dict(tuple(df.groupby("system", sort=False, observed=True)))
+    bundle = {"layout": None, "figures": {}}
+    for system in systems:
+        rows = parts.get(system, df.iloc[:0])
+        fig = pack_figure(chart(rows, system, *args))
+        layout = fig.pop("layout")
+        fig["layout"] = {i: layout.pop(i) for i in system_layout if i in layout}
+        if bundle["layout"] is None:
+            bundle["layout"] = layout
+        bundle["figures"][system] = fig
+
+    return bundle
+
+
 #############################################################################
 # Backstop
 #############################################################################
@@ -4,6 +4,8 @@
 import utility_functions as uf
 
 # This is the list of file locations that are plain-text sar logs
+# Output of "sadf -d -t" and binary sa files (read through the local sadf)
+# are picked up as well.
 # Each entry is the storage point for a specific system's logs to be compared
 # The system assumes the files will be stored in a format of:
 # base_path/SYSTEM_NAME/file_prefix
@@ -18,3 +20,55 @@ file_locations = [
 # Generate a list of systems from the above list for use in the interface
 system_list = uf.create_system_list(file_locations)
 default_system = system_list[0]
+
+# Parsed sections are cached here so a log file only has to be parsed once
+# per change.  Entries are rebuilt automatically when a log file changes.
+# Set to None to turn the cache off.
+cache_dir = "./cache"
+
+# Charts drawn for past days are kept here as JSON and sent as they are on
+# the next visit, until one of the day's logs changes.  Set
+# figure_cache_gzip to store them compressed, or the directory to None to
+# turn this off.
+figure_cache_dir = "./cache/figures"
+figure_cache_gzip = False
+
+# Most space (in MB) the cached figures may take up, the ones used longest
+# ago are dropped to stay under it.  None for no limit.
+figure_cache_mb = 500
+
+# Memory budget (in MB) for parsed frames kept in memory and shared
+# between the chart callbacks
+frame_cache_mb = 512
+
+# Number of processes used to parse the logs for each system in parallel
+# None uses every core, 1 parses everything in the dashboard process
+parse_workers = None
+
+# Parse a day's logs in a background job, showing progress for each system,
+# rather than in the request for the charts.  At most load_jobs jobs run
+# at once, others wait their turn.
+background_loads = True
+load_jobs = 2
+
+# Logs written to within this many seconds are treated as live.  They are
+# followed (only new rows get parsed) instead of being read from the top,
+# and the System View refreshes every live_refresh seconds while showing
+# today's logs.
+live_window = 3600
+live_refresh = 60
+
+# Keep every CPU, device and interface row rather than just the aggregate
+# CPU row and eth0 / lo.  Needed for the per-CPU heatmap on the System View
+# and for interfaces other than eth0; the parsed frames get a lot bigger.
+full_fidelity = False
+
+# Parsed logs are copied into this SQLite file by ingest.py (run it from
+# cron) so history outlives the month of logs sar keeps.  Date ranges read
+# the days found there instead of parsing the logs again, from 1 minute,
+# 5 minute or hourly rollups when the range is long enough.
+store_path = "./store/sar.db"
+
+# When a range of dates is shown, each system's data is cut down to about
+# this many points per chart, keeping the lowest and highest values
+range_points = 2000
@@ -0,0 +1,42 @@
+"""
+    Copy the sar logs of the configured systems into the columnar store
+    (configs.store_path) so their history can be queried long after sar
+    has rotated the files away.
+
+    Only logs that changed since the last run get parsed, so it is safe to
+    run as often as you like, for example from cron:
+
+    */10 * * * * cd /path/to/directory && python ingest.py
+"""
+import argparse
+import time
+import configs as conf
+import utility_functions as uf
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store parsed sar logs")
+    parser.add_argument(
+        "--store",
+        default=conf.store_path,
+        help="SQLite file to store into (default: configs.store_path)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="store every log again, even the unchanged ones",
+    )
+    args = parser.parse_args()
+
+    start = time.time()
+    stored = uf.ingest_logs(conf.file_locations, args.store, args.force)
+    for log in stored:
+        print("Stored", log)
+    print("%d logs stored in %.1f s" % (len(stored), time.time() - start))
+
+
+#############################################################################
+# Backstop
+#############################################################################
+if __name__ == "__main__":
+    main()
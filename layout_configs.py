@@ -106,6 +106,32 @@ layout_vertical = go.Layout(
     ),
 )
 
+#############################################################################
+# Downsampling
+#############################################################################
+# Most points drawn for any one trace.  Busier traces are cut down to the
+# min and max of each bucket of points; zooming in brings the detail back.
+# Set to None to send every point, for when exact values matter.
+max_trace_points = 2000
+
+# Figures with more points than this (over all their traces) are drawn with
+# WebGL, which keeps up with far more points than SVG.  None for SVG always.
+webgl_points = 10000
+
+#############################################################################
+# Figure payload
+#############################################################################
+# Figures are sent packed: times as a start and a step (or offsets in
+# seconds) shared by every trace drawn at the same times, and values rounded
+# to the decimals below.  The browser unpacks them (assets/clientside.js).
+# Set to False to send plain figures with every value as it is.
+compact_figures = True
+
+# Decimals kept for a column, by the start of its name.  sar writes two
+# decimals, so only averaged values lose anything.
+value_decimals = {"kb": 0}
+default_decimals = 2
+
 #############################################################################
 # Drawing tools and widget removal
 #############################################################################
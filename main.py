@@ -1,6 +1,11 @@
+from datetime import date
+import threading
+import uuid
+from collections import OrderedDict
 import dash
 from dash import html, dcc
-from dash.dependencies import Input, Output
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import configs as conf
 import charting_functions as cf
@@ -135,7 +140,7 @@ day_list = [
 system_select = dbc.Row(
     [
         dbc.Col(
-            md=2,
+            md=1,
         ),
         dbc.Col(
             [
@@ -156,7 +161,7 @@ system_select = dbc.Row(
             md=3,
         ),
         dbc.Col(
-            md=2,
+            md=1,
         ),
         dbc.Col(
             [
@@ -175,12 +180,61 @@ system_select = dbc.Row(
             md=3,
         ),
         dbc.Col(
-            md=2,
+            [
+                html.Div(
+                    [
+                        "Date Range:",
+                        dcc.DatePickerRange(
+                            id="date-range",
+                            clearable=True,
+                        ),
+                        dcc.Store(id="sys-dates"),
+                    ],
+                    className="dash-bootstrap",
+                ),
+            ],
+            md=3,
+        ),
+        dbc.Col(
+            md=1,
         ),
     ]
 )
 
 
+# While today's logs are on screen the charts refresh on this timer
+live_refresh = dcc.Interval(
+    id="live-refresh",
+    interval=conf.live_refresh * 1000,
+)
+
+
+# Big days are loaded by a background job (see load_callback) while a bar
+# for each system shows how far it's got.  The loaded store gets the dates
+# once everything's ready, which is when the charts get drawn.
+def load_progress(prefix):
+    return html.Div(
+        [
+            dcc.Store(id=prefix + "-job"),
+            dcc.Store(id=prefix + "-loaded"),
+            dcc.Interval(id=prefix + "-job-poll", interval=1000, disabled=True),
+            html.Div(id=prefix + "-progress"),
+        ]
+    )
+
+
+# Charts are only drawn once they're scrolled into view.  The browser checks
+# what's on screen on this timer (without asking the server anything) and
+# keeps the result in the store, which the chart callbacks listen to.
+def visibility(prefix):
+    return html.Div(
+        [
+            dcc.Store(id=prefix + "-visible"),
+            dcc.Interval(id=prefix + "-visible-poll", interval=500),
+        ]
+    )
+
+
 #############################################################################
 # Single System Configs
 #############################################################################
@@ -188,34 +242,90 @@ system_select = dbc.Row(
 sys_cpu = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="sys-cpu",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-cpu",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-cpu-hosts"),
+                ],
+                type="circle",
             ),
             md=12,
         ),
     ]
 )
 
+# Every CPU on one chart, only with conf.full_fidelity (the per-CPU rows are
+# dropped otherwise)
+sys_cpu_heatmap = dbc.Row(
+    [
+        dbc.Col(
+            [
+                html.Div(
+                    [
+                        "CPU Column:",
+                        dcc.Dropdown(
+                            id="sys-cpu-column",
+                            options=[
+                                {"label": i, "value": i}
+                                for i in ["%usr", "%sys", "%iowait", "%idle"]
+                            ],
+                            value="%idle",
+                            clearable=False,
+                        ),
+                    ],
+                    className="dash-bootstrap",
+                ),
+                dcc.Loading(
+                    [
+                        dcc.Graph(
+                            id="sys-cpu-heatmap",
+                            style={"height": "45vh"},
+                            config=lc.tool_config,
+                        ),
+                        dcc.Store(id="sys-cpu-heatmap-hosts"),
+                    ],
+                    type="circle",
+                ),
+            ],
+            md=12,
+        ),
+    ]
+)
+
 sys_mem = dbc.Row(
     [
         dbc.Col(
             html.Div(
-                dcc.Graph(
-                    id="sys-mem-use",
-                    style={"height": "45vh"},
-                    config=lc.tool_config,
+                dcc.Loading(
+                    [
+                        dcc.Graph(
+                            id="sys-mem-use",
+                            style={"height": "45vh"},
+                            config=lc.tool_config,
+                        ),
+                        dcc.Store(id="sys-mem-use-hosts"),
+                    ],
+                    type="circle",
                 ),
             ),
             md=6,
         ),
         dbc.Col(
             html.Div(
-                dcc.Graph(
-                    id="sys-mem-stats",
-                    style={"height": "45vh"},
-                    config=lc.tool_config,
+                dcc.Loading(
+                    [
+                        dcc.Graph(
+                            id="sys-mem-stats",
+                            style={"height": "45vh"},
+                            config=lc.tool_config,
+                        ),
+                        dcc.Store(id="sys-mem-stats-hosts"),
+                    ],
+                    type="circle",
                 ),
             ),
             md=6,
@@ -227,18 +337,30 @@ sys_mem = dbc.Row(
 sys_swap = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="sys-swap-use",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-swap-use",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-swap-use-hosts"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="sys-swap-stats",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-swap-stats",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-swap-stats-hosts"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -249,10 +371,16 @@ sys_swap = dbc.Row(
 sys_load = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="sys-load",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-load",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-load-hosts"),
+                ],
+                type="circle",
             ),
             md=12,
         ),
@@ -262,18 +390,30 @@ sys_load = dbc.Row(
 sys_io_task = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="sys-io",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-io",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-io-hosts"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="sys-task",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-task",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-task-hosts"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -284,18 +424,30 @@ sys_io_task = dbc.Row(
 sys_paging = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="sys-page",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-page",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-page-hosts"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="sys-h-page",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="sys-h-page",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="sys-h-page-hosts"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -306,11 +458,26 @@ sys_paging = dbc.Row(
 sys_network = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="sys-network",
-                style={"height": "45vh"},
-                config=lc.tool_config,
-            ),
+            [
+                html.Div(
+                    [
+                        "Interface:",
+                        dcc.Dropdown(id="sys-iface", value="eth0", clearable=False),
+                    ],
+                    className="dash-bootstrap",
+                ),
+                dcc.Loading(
+                    [
+                        dcc.Graph(
+                            id="sys-network",
+                            style={"height": "45vh"},
+                            config=lc.tool_config,
+                        ),
+                        dcc.Store(id="sys-network-hosts"),
+                    ],
+                    type="circle",
+                ),
+            ],
             md=12,
         ),
     ]
@@ -319,7 +486,7 @@ sys_network = dbc.Row(
 #############################################################################
 # Comparative System Configs
 #############################################################################
-# We only need the day selector for the system comparison pages
+# We only need the day selectors for the system comparison pages
 day_select = dbc.Row(
     [
         dbc.Col(
@@ -341,6 +508,27 @@ day_select = dbc.Row(
             ],
             md=3,
         ),
+        dbc.Col(
+            md=1,
+        ),
+        dbc.Col(
+            [
+                html.Div(
+                    [
+                        "Date Range:",
+                        dcc.DatePickerRange(
+                            id="comp-date-range",
+                            clearable=True,
+                        ),
+                        dcc.Store(id="comp-dates"),
+                        visibility("comp"),
+                        load_progress("comp"),
+                    ],
+                    className="dash-bootstrap",
+                ),
+            ],
+            md=4,
+        ),
         dbc.Col(
             md=2,
         ),
@@ -356,18 +544,30 @@ day_select = dbc.Row(
 comp_cpu1 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="cpu-usr",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="cpu-usr",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="cpu-usr-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="cpu-sys",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="cpu-sys",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="cpu-sys-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -378,18 +578,30 @@ comp_cpu1 = dbc.Row(
 comp_cpu2 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="cpu-iowait",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="cpu-iowait",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="cpu-iowait-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="cpu-soft",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="cpu-soft",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="cpu-soft-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -400,18 +612,30 @@ comp_cpu2 = dbc.Row(
 comp_cpu3 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="cpu-idle",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="cpu-idle",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="cpu-idle-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="cpu-nice",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="cpu-nice",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="cpu-nice-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -426,18 +650,30 @@ comp_cpu3 = dbc.Row(
 comp_mem1 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbmemfree",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbmemfree",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbmemfree-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbmemused",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbmemused",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbmemused-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -447,18 +683,30 @@ comp_mem1 = dbc.Row(
 comp_mem2 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbbuffers",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbbuffers",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbbuffers-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbcached",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbcached",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbcached-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -468,18 +716,30 @@ comp_mem2 = dbc.Row(
 comp_mem3 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbcommit",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbcommit",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbcommit-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbdirty",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbdirty",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbdirty-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -489,18 +749,30 @@ comp_mem3 = dbc.Row(
 comp_mem4 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbactive",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbactive",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbactive-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="mem-kbinact",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="mem-kbinact",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="mem-kbinact-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -514,18 +786,30 @@ comp_mem4 = dbc.Row(
 comp_swap2 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="swap-kbswpfree",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-kbswpfree",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-kbswpfree-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="swap-kbswpused",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-kbswpused",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-kbswpused-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -538,10 +822,16 @@ comp_swap3 = dbc.Row(
             md=2,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="swap-kbswpcad",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-kbswpcad",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-kbswpcad-packed"),
+                ],
+                type="circle",
             ),
             md=8,
         ),
@@ -554,18 +844,30 @@ comp_swap3 = dbc.Row(
 comp_swap1 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="swap-swpused",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-swpused",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-swpused-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="swap-swpcad",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-swpcad",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-swpcad-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -575,18 +877,30 @@ comp_swap1 = dbc.Row(
 comp_swap4 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="swap-pswpin",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-pswpin",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-pswpin-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="swap-pswpout",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="swap-pswpout",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="swap-pswpout-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -601,18 +915,30 @@ comp_swap4 = dbc.Row(
 comp_load1 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="load-ldavg-1",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="load-ldavg-1",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="load-ldavg-1-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="load-ldavg-15",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="load-ldavg-15",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="load-ldavg-15-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -622,18 +948,30 @@ comp_load1 = dbc.Row(
 comp_load2 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="load-pct_plist",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="load-pct_plist",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="load-pct_plist-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="load-pct_blocked",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="load-pct_blocked",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="load-pct_blocked-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -648,18 +986,30 @@ comp_load2 = dbc.Row(
 comp_io1 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="io-rtps",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="io-rtps",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="io-rtps-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="io-wtps",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="io-wtps",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="io-wtps-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -669,10 +1019,16 @@ comp_io1 = dbc.Row(
 comp_io2 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="io-tps",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="io-tps",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="io-tps-packed"),
+                ],
+                type="circle",
             ),
             md=12,
         ),
@@ -682,18 +1038,30 @@ comp_io2 = dbc.Row(
 comp_io3 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="io-breads",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="io-breads",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="io-breads-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
         dbc.Col(
-            dcc.Graph(
-                id="io-bwrtns",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="io-bwrtns",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="io-bwrtns-packed"),
+                ],
+                type="circle",
             ),
             md=6,
         ),
@@ -703,13 +1071,37 @@ comp_io3 = dbc.Row(
 #############################################################################
 # NETWORK
 #############################################################################
+comp_iface = dbc.Row(
+    [
+        dbc.Col(
+            md=2,
+        ),
+        dbc.Col(
+            html.Div(
+                [
+                    "Interface:",
+                    dcc.Dropdown(id="comp-iface", value="eth0", clearable=False),
+                ],
+                className="dash-bootstrap",
+            ),
+            md=3,
+        ),
+    ]
+)
+
 comp_net1 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="net-rxpck",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="net-rxpck",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="net-rxpck-packed"),
+                ],
+                type="circle",
             ),
             md=12,
         ),
@@ -719,10 +1111,16 @@ comp_net1 = dbc.Row(
 comp_net2 = dbc.Row(
     [
         dbc.Col(
-            dcc.Graph(
-                id="net-txpck",
-                style={"height": "45vh"},
-                config=lc.tool_config,
+            dcc.Loading(
+                [
+                    dcc.Graph(
+                        id="net-txpck",
+                        style={"height": "45vh"},
+                        config=lc.tool_config,
+                    ),
+                    dcc.Store(id="net-txpck-packed"),
+                ],
+                type="circle",
             ),
             md=12,
         ),
@@ -733,9 +1131,9 @@ comp_net2 = dbc.Row(
 # Layout Creation Section
 ####################################################
 system = html.Div(
-    [
-        system_select,
-        sys_cpu,
+    [system_select, live_refresh, visibility("sys"), load_progress("sys"), sys_cpu]
+    + ([sys_cpu_heatmap] if conf.full_fidelity else [])
+    + [
         sys_mem,
         sys_swap,
         sys_load,
@@ -800,6 +1198,7 @@ comp_io = html.Div(
 comp_net = html.Div(
     [
         day_select,
+        comp_iface,
         comp_net1,
         comp_net2,
     ],
@@ -813,16 +1212,141 @@ app = dash.Dash(
     __name__,
     suppress_callback_exceptions=True,
     external_stylesheets=[dbc.themes.CYBORG],
+    compress=True,
 )
 app.config.suppress_callback_exceptions = True
 app.title = "System Performance Log Analysis"
-app.layout = html.Div(
-    [dcc.Location(id="url", refresh=False), sidebar, html.Div(id="page-content")]
+
+
+# Built for every page load, so each browser tab gets its own session id
+def serve_layout():
+    return html.Div(
+        [
+            dcc.Location(id="url", refresh=False),
+            dcc.Store(id="session", data=uuid.uuid4().hex),
+            dcc.Store(id="viewport"),
+            sidebar,
+            html.Div(id="page-content"),
+        ]
+    )
+
+
+app.layout = serve_layout
+
+# The browser window's width in pixels, so date ranges aren't sent more
+# points than can be drawn
+app.clientside_callback(
+    ClientsideFunction(namespace="clientside", function_name="width"),
+    Output("viewport", "data"),
+    Input("url", "pathname"),
+)
+
+# Which charts have been scrolled into view, see assets/clientside.js
+app.clientside_callback(
+    ClientsideFunction(namespace="clientside", function_name="visible"),
+    Output("sys-visible", "data"),
+    [
+        Input("sys-visible-poll", "n_intervals"),
+        Input("sys-loaded", "data"),
+    ],
+    State("sys-visible", "data"),
 )
 
+app.clientside_callback(
+    ClientsideFunction(namespace="clientside", function_name="visible"),
+    Output("comp-visible", "data"),
+    [
+        Input("comp-visible-poll", "n_intervals"),
+        Input("comp-loaded", "data"),
+    ],
+    State("comp-visible", "data"),
+)
+
+# The System View's charts get every system's figure at once (the graph's
+# -hosts store) and the browser shows the one picked, so switching systems
+# is done without the server
+system_graphs = [
+    "sys-cpu",
+    "sys-cpu-heatmap",
+    "sys-mem-use",
+    "sys-mem-stats",
+    "sys-swap-use",
+    "sys-swap-stats",
+    "sys-load",
+    "sys-io",
+    "sys-task",
+    "sys-page",
+    "sys-h-page",
+    "sys-network",
+]
+
+for graph in system_graphs:
+    app.clientside_callback(
+        ClientsideFunction(namespace="clientside", function_name="system"),
+        Output(graph, "figure"),
+        [
+            Input(graph + "-hosts", "data"),
+            Input("system", "value"),
+        ],
+    )
+
+
+####################################################
+#  Callbacks - generations
+####################################################
+# Moving to another page, day or range starts a new generation for the
+# browser tab, and the dates stores carry the generation they were picked
+# in.  Charts still being worked on for an older generation give up rather
+# than hold up the ones now wanted.  Kept per process, like the caches.
+# Only the tabs that moved on most recently are remembered, a tab that's
+# been forgotten has its charts drawn as they come.
+generations = OrderedDict()
+generations_guard = threading.Lock()
+max_generations = 10000
+
+
+def new_generation(session):
+    with generations_guard:
+        generations[session] = generations.get(session, 0) + 1
+        generations.move_to_end(session)
+        while len(generations) > max_generations:
+            generations.popitem(last=False)
+        return generations[session]
+
+
+# Stop here if the dates are from a generation that's been moved on from
+def still_current(dates):
+    session = dates.get("session")
+    if session is None:
+        return
+
+    current = generations.get(session)
+    if current is not None and current != dates["generation"]:
+        raise PreventUpdate
+
+
+# Only draw a chart that's on screen: charts that just came into view, or
+# ones already in view when something else (a zoom, the refresh...) asks
+def on_screen(graph, visible):
+    if not visible:
+        raise PreventUpdate
+
+    triggered = [i["prop_id"] for i in dash.callback_context.triggered]
+    others = [i for i in triggered if not i.endswith("-visible.data")]
+    if graph in visible["new"] or (others and graph in visible["seen"]):
+        return
+
+    raise PreventUpdate
+
+
 # Multi-page selector callback
-@app.callback(Output("page-content", "children"), Input("url", "pathname"))
-def display_page(pathname):
+@app.callback(
+    Output("page-content", "children"),
+    Input("url", "pathname"),
+    State("session", "data"),
+)
+def display_page(pathname, session):
+    new_generation(session)
     if pathname == "/compcpu":
         return comp_cpu
     if pathname == "/compmem":
@@ -840,628 +1364,892 @@ def display_page(pathname):
 
 
 ####################################################
-#  Callbacks - charts
+#  Callbacks - date selection
 ####################################################
-# All charts are generated dynamically so this section gets pretty long
+# The day dropdown and the date range feed a store holding what's to be
+# shown: {"day": "01"} for a single day's logs or {"start": ..., "end": ...}
+# for a range of dates.  Whichever was changed last wins.
+# Each choice also starts a new generation (see above).
+def select_dates(day, start, end, session):
+    generation = {"session": session, "generation": new_generation(session)}
+    triggered = [i["prop_id"] for i in dash.callback_context.triggered]
+    range_changed = any(i.endswith(("start_date", "end_date")) for i in triggered)
+    if range_changed and start and end:
+        return dict(generation, start=start[:10], end=end[:10])
+
+    return dict(generation, day=day)
 
-# This is the main list of sections we can extract
-# "CPU", "TASK", "SWAP_STATS", "PAGE_STATS", "IO_STATS", "MEM_STATS", "MEM_USE",
-# "SWAP_USE", "HUGEPAGES", "INODE", "LOAD", "TTY", "BLOCK", "NETWORK_ACTIVITY",
-# "NETWORK_ERROR", "NFS_CLIENT", "NFS_SERVER", "SOCKETS"
 
-####################################################
-#  Single System
-####################################################
-# System-level Reports
-# CPU
 @app.callback(
-    dash.dependencies.Output("sys-cpu", "figure"),
+    Output("sys-dates", "data"),
     [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
+        Input("day-picker", "value"),
+        Input("date-range", "start_date"),
+        Input("date-range", "end_date"),
     ],
+    State("session", "data"),
 )
-def cpu(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.monitoring_line_chart(df, system, "CPU DATA", 0, rb_df)
-    return fig
+def sys_dates(day, start, end, session):
+    return select_dates(day, start, end, session)
 
 
-# Memory stats
 @app.callback(
-    dash.dependencies.Output("sys-mem-stats", "figure"),
+    Output("comp-dates", "data"),
     [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
+        Input("comp-day-picker", "value"),
+        Input("comp-date-range", "start_date"),
+        Input("comp-date-range", "end_date"),
     ],
-)
-def mem(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_STATS")
-    fig = cf.monitoring_line_chart(df, system, "MEMORY STATS", 0, rb_df)
-    return fig
+    State("session", "data"),
+)
+def comp_dates(day, start, end, session):
+    return select_dates(day, start, end, session)
+
+
+# Load a section (or the restarts) for the selected dates
+# Ranges are averaged down to conf.range_points per system (or the window's
+# width in pixels if that's less), zooming in on a range reloads just the
+# zoomed days so the detail comes back
+# Loading is where the time goes, so the generation is checked before and
+# after.
+def load_section(dates, section, xrange=None, width=None):
+    if not dates:
+        raise PreventUpdate
+    still_current(dates)
+
+    if "day" in dates:
+        wait_for_load(dates, [section])
+        df = uf.get_section_all_files(conf.file_locations, dates["day"], section)
+    else:
+        start, end = dates["start"], dates["end"]
+        # A window panned off the dates has nothing to load, leave the
+        # chart as it is
+        if xrange is not None:
+            start, end = max(start, xrange[0][:10]), min(end, xrange[1][:10])
+            if start > end:
+                raise PreventUpdate
 
+        points = conf.range_points
+        if width:
+            points = min(points, int(width))
 
-# Memory use
-@app.callback(
-    dash.dependencies.Output("sys-mem-use", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def mem(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.monitoring_line_chart(df, system, "MEMORY USE", 0, rb_df)
-    return fig
+        df = uf.get_section_range(conf.file_locations, start, end, section, points)
 
+    still_current(dates)
+    return df
 
-# Swap stats
-@app.callback(
-    dash.dependencies.Output("sys-swap-stats", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def swap(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_STATS")
-    fig = cf.monitoring_line_chart(df, system, "SWAP STATS", 0, rb_df)
-    return fig
 
+def load_reboots(dates):
+    if not dates:
+        raise PreventUpdate
+    still_current(dates)
 
-# Swap use
-@app.callback(
-    dash.dependencies.Output("sys-swap-use", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def swap(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_USE")
-    fig = cf.monitoring_line_chart(df, system, "SWAP USE", 0, rb_df)
-    return fig
+    if "day" in dates:
+        wait_for_load(dates, ["REBOOTS"])
+        return uf.get_reboots(conf.file_locations, dates["day"])
 
+    return uf.get_reboots_range(conf.file_locations, dates["start"], dates["end"])
 
-# Load
-@app.callback(
-    dash.dependencies.Output("sys-load", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def load(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "LOAD")
-    load_df = uf.load_stats(df)
-    fig = cf.monitoring_line_chart(load_df, system, "LOAD STATS", 0, rb_df)
-    return fig
 
+# Leave the parsing to the load job rather than hold up the request, the
+# charts are drawn again when the job is done
+def wait_for_load(dates, sections):
+    if not conf.background_loads:
+        return
 
-# IO
-@app.callback(
-    dash.dependencies.Output("sys-io", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def load(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "IO_STATS")
-    fig = cf.monitoring_line_chart(df, system, "I/O STATS", 0, rb_df)
-    return fig
+    logs = uf.generate_file_list(conf.file_locations, dates["day"])
+    if not uf.logs_ready(logs, sections):
+        raise PreventUpdate
 
 
-# Task
-@app.callback(
-    dash.dependencies.Output("sys-task", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def load(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "TASK")
-    fig = cf.monitoring_line_chart(df, system, "TASK STATS", 0, rb_df)
-    return fig
+####################################################
+#  Callbacks - load jobs
+####################################################
+# Sections drawn on the System view, the comparison pages' come from
+# comparison_pages
+system_sections = [
+    "CPU",
+    "MEM_STATS",
+    "MEM_USE",
+    "SWAP_STATS",
+    "SWAP_USE",
+    "LOAD",
+    "IO_STATS",
+    "TASK",
+    "PAGE_STATS",
+    "INODE",
+    "NETWORK_ACTIVITY",
+    "REBOOTS",
+]
 
 
-# Page
-@app.callback(
-    dash.dependencies.Output("sys-page", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def load(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "PAGE_STATS")
-    fig = cf.monitoring_line_chart(df, system, "PAGE STATS", 0, rb_df)
-    return fig
+def comparison_sections(pathname):
+    charts = comparison_pages.get((pathname or "")[len("/comp") :], [])
+    return sorted({i[1] for i in charts}) + ["REBOOTS"]
 
 
-# Inodes
-@app.callback(
-    dash.dependencies.Output("sys-h-page", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def load(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "INODE")
-    fig = cf.monitoring_line_chart(df, system, "INODE STATS", 0, rb_df)
-    return fig
+# One bar per system: waiting, parsing, done or failed
+load_colors = {
+    "waiting": "secondary",
+    "parsing": "info",
+    "done": "success",
+    "failed": "danger",
+}
 
 
-# Network Activity
-@app.callback(
-    dash.dependencies.Output("sys-network", "figure"),
-    [
-        dash.dependencies.Input("system", "value"),
-        dash.dependencies.Input("day-picker", "value"),
-    ],
-)
-def load(system, day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "NETWORK_ACTIVITY")
-    df1 = df.loc[df["IFACE"] == "eth0"]
-    fig = cf.monitoring_line_chart(df1, system, "NETWORK ACTIVITY STATS", 0, rb_df)
+def progress_bars(progress):
+    return [
+        dbc.Row(
+            [
+                dbc.Col(html.Small(system), md=2),
+                dbc.Col(
+                    dbc.Progress(
+                        state,
+                        value=100,
+                        color=load_colors[state],
+                        striped=state == "parsing",
+                        animated=state == "parsing",
+                    ),
+                    md=8,
+                ),
+            ]
+        )
+        for system, state in progress["hosts"]
+    ]
+
+
+# A new day starts a job for the page's sections (unless they're already
+# in the cache), which is then polled for progress until it's done.  Ranges
+# and conf.background_loads = False go straight to the charts.
+def load_callback(prefix, sections):
+    @app.callback(
+        [
+            Output(prefix + "-job", "data"),
+            Output(prefix + "-loaded", "data"),
+            Output(prefix + "-progress", "children"),
+            Output(prefix + "-job-poll", "disabled"),
+        ],
+        [
+            Input(prefix + "-dates", "data"),
+            Input(prefix + "-job-poll", "n_intervals"),
+        ],
+        [
+            State(prefix + "-job", "data"),
+            State("url", "pathname"),
+        ],
+    )
+    def load_job(dates, poll, job, pathname):
+        if not dates:
+            raise PreventUpdate
+
+        triggered = [i["prop_id"] for i in dash.callback_context.triggered]
+        if any(i.startswith(prefix + "-dates.") for i in triggered):
+            job_id = None
+            if conf.background_loads and "day" in dates:
+                logs = uf.generate_file_list(conf.file_locations, dates["day"])
+                job_id = uf.get_load_jobs().submit(logs, sections(pathname))
+            if job_id is None:
+                return None, dates, [], True
+            job = {"id": job_id, "dates": dates}
+        elif job is None:
+            raise PreventUpdate
+
+        progress = uf.get_load_jobs().progress(job["id"])
+        if progress is None:
+            return None, job["dates"], [], True
+        if progress["done"]:
+            failed = [i for i in progress["hosts"] if i[1] == "failed"]
+            return None, job["dates"], progress_bars(progress) if failed else [], True
+
+        return job, dash.no_update, progress_bars(progress), False
+
+    return load_job
+
+
+load_callback("sys", lambda pathname: system_sections)
+load_callback("comp", comparison_sections)
+
+
+# Charts are sent downsampled, so a zoom asks for the window again at full
+# detail and a double click (autorange) goes back to the whole view.
+# Other chart changes like drawn shapes leave the figure alone.
+def zoom_range(relayout):
+    triggered = [i["prop_id"] for i in dash.callback_context.triggered]
+    if not any(i.endswith(".relayoutData") for i in triggered) or not relayout:
+        return None
+    if "xaxis.range[0]" in relayout:
+        return [relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]]
+    if "xaxis.range" in relayout:
+        return relayout["xaxis.range"]
+    if "xaxis.autorange" in relayout:
+        return None
+
+    raise PreventUpdate
+
+
+# A past day's figure is drawn once and kept on disk (see uf.read_figure),
+# keyed by the chart, the day and whatever else picks what's drawn (the
+# interface...).  Ranges and zoomed in views are always drawn.
+def cached_figure(graph, dates, xrange, draw, *choices):
+    still_current(dates)
+    if "day" not in dates or xrange is not None:
+        return draw()
+
+    logs = uf.generate_file_list(conf.file_locations, dates["day"])
+    key = [graph, dates["day"]] + list(choices)
+    fig = uf.read_figure(key, logs)
+    if fig is None:
+        fig = draw()
+        uf.write_figure(key, logs, fig)
+
     return fig
 
 
 ####################################################
-#  Comparisons
+#  Callbacks - charts
 ####################################################
-# CPU
-# usr, sys, iowait, soft, nice, idle
-@app.callback(
-    dash.dependencies.Output("cpu-usr", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def cpu_usr(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.comparison_line_chart(df, "%usr", "CPU", 0, rb_df)
-    return fig
+# All charts are generated dynamically so this section gets pretty long
 
+# This is the main list of sections we can extract
+# "CPU", "TASK", "SWAP_STATS", "PAGE_STATS", "IO_STATS", "MEM_STATS", "MEM_USE",
+# "SWAP_USE", "HUGEPAGES", "INODE", "LOAD", "TTY", "BLOCK", "NETWORK_ACTIVITY",
+# "NETWORK_ERROR", "NFS_CLIENT", "NFS_SERVER", "SOCKETS"
 
-# sys
-@app.callback(
-    dash.dependencies.Output("cpu-sys", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def cpu_sys(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.comparison_line_chart(df, "%sys", "CPU", 0, rb_df)
-    return fig
+####################################################
+#  Single System
+####################################################
+# The refresh timer only matters while today's logs are on screen.
+# Followed logs make the refresh cheap: only the new rows are parsed.
+def skip_refresh(dates):
+    triggered = [i["prop_id"] for i in dash.callback_context.triggered]
+    if triggered == ["live-refresh.n_intervals"] and not shows_today(dates):
+        raise PreventUpdate
 
 
-# iowait
-@app.callback(
-    dash.dependencies.Output("cpu-iowait", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def cpu_iowait(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.comparison_line_chart(df, "%iowait", "CPU", 0, rb_df)
-    return fig
+def shows_today(dates):
+    if "day" in dates:
+        return dates["day"] == uf.today()
 
+    return dates["end"] >= date.today().isoformat()
 
-# soft
-@app.callback(
-    dash.dependencies.Output("cpu-soft", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def cpu_soft(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.comparison_line_chart(df, "%soft", "CPU", 0, rb_df)
-    return fig
 
+# The aggregate CPU row, the others are only there with conf.full_fidelity
+def all_cpus(df):
+    return df.loc[df["CPU"] == "all"]
 
-# idle
-@app.callback(
-    dash.dependencies.Output("cpu-idle", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def cpu_idle(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.comparison_line_chart(df, "%idle", "CPU", 0, rb_df)
-    return fig
 
+# One interface's rows, picked from the interface dropdown
+def one_interface(df, iface):
+    return df.loc[df["IFACE"] == iface]
 
-# nice
-@app.callback(
-    dash.dependencies.Output("cpu-nice", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def cpu_nice(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "CPU")
-    fig = cf.comparison_line_chart(df, "%nice", "CPU", 0, rb_df)
-    return fig
 
+# Fill an interface dropdown from the interfaces found in the logs, holding
+# on to the current choice while it's still there
+def interface_options(dates, current):
+    df = load_section(dates, "NETWORK_ACTIVITY")
+    names = uf.section_keys(df, "NETWORK_ACTIVITY")
+    options = [{"label": i, "value": i} for i in names]
+    if current in names or not names:
+        return options, current
+    if "eth0" in names:
+        return options, "eth0"
 
-# memory
-# kbmemfree, kbmemused, kbbuffers, kbcached, kbcommit, kbactive, kbinact, kbdirty
-@app.callback(
-    dash.dependencies.Output("mem-kbmemfree", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def mem_free(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbmemfree", "MEM USE", 0, rb_df)
-    return fig
+    return options, names[0]
 
 
-# kbmemused
 @app.callback(
-    dash.dependencies.Output("mem-kbmemused", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Output("sys-iface", "options"),
+        dash.dependencies.Output("sys-iface", "value"),
     ],
+    dash.dependencies.Input("sys-loaded", "data"),
+    dash.dependencies.State("sys-iface", "value"),
 )
-def mem_used(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbmemused", "MEM USE", 0, rb_df)
-    return fig
+def sys_interfaces(dates, current):
+    return interface_options(dates, current)
 
 
 @app.callback(
-    dash.dependencies.Output("mem-kbbuffers", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Output("comp-iface", "options"),
+        dash.dependencies.Output("comp-iface", "value"),
     ],
+    dash.dependencies.Input("comp-loaded", "data"),
+    dash.dependencies.State("comp-iface", "value"),
 )
-def mem_buffers(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbbuffers", "MEM USE", 0, rb_df)
-    return fig
+def comp_interfaces(dates, current):
+    return interface_options(dates, current)
 
 
+# System-level Reports
+# CPU
 @app.callback(
-    dash.dependencies.Output("mem-kbcached", "figure"),
+    dash.dependencies.Output("sys-cpu-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-cpu", "relayoutData"),
     ],
-)
-def mem_cached(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbcached", "MEM USE", 0, rb_df)
-    return fig
-
-
-@app.callback(
-    dash.dependencies.Output("mem-kbcommit", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def mem_commit(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbcommit", "MEM USE", 0, rb_df)
-    return fig
+def cpu(visible, refresh, relayout, dates, width):
+    on_screen("sys-cpu", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
 
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "CPU", xrange, width)
+        df = all_cpus(df)
+        return cf.system_figures(
+            conf.system_list, cf.monitoring_line_chart, df, "CPU DATA", 0, rb_df, xrange
+        )
 
-@app.callback(
-    dash.dependencies.Output("mem-kbactive", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def mem_active(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbactive", "MEM USE", 0, rb_df)
-    return fig
+    return cached_figure("sys-cpu", dates, xrange, draw)
 
 
+# Every CPU as a heatmap, only laid out with conf.full_fidelity
 @app.callback(
-    dash.dependencies.Output("mem-kbinact", "figure"),
+    dash.dependencies.Output("sys-cpu-heatmap-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-cpu-column", "value"),
+        dash.dependencies.Input("sys-cpu-heatmap", "relayoutData"),
     ],
-)
-def mem_inactive(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbinact", "MEM USE", 0, rb_df)
-    return fig
-
-
-@app.callback(
-    dash.dependencies.Output("mem-kbdirty", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def mem_dirty(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "MEM_USE")
-    fig = cf.comparison_line_chart(df, "kbdirty", "MEM USE", 0, rb_df)
-    return fig
+def cpu_heatmap(visible, refresh, column, relayout, dates, width):
+    on_screen("sys-cpu-heatmap", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "CPU", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.heatmap_chart,
+            df,
+            column,
+            "CPU",
+            "CPU DATA",
+            0,
+            rb_df,
+            xrange,
+        )
+
+    return cached_figure("sys-cpu-heatmap", dates, xrange, draw, column)
 
 
-# Swap
-# kbswpfree, kbswpused, %swpused, kbswpcad, %swpcad, pswpin/s, pswpout/s
+# Memory stats
 @app.callback(
-    dash.dependencies.Output("swap-kbswpfree", "figure"),
+    dash.dependencies.Output("sys-mem-stats-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-mem-stats", "relayoutData"),
     ],
-)
-def swap_free(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_USE")
-    fig = cf.comparison_line_chart(df, "kbswpfree", "SWAP USE", 0, rb_df)
-    return fig
-
-
-@app.callback(
-    dash.dependencies.Output("swap-kbswpused", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def swap_used(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_USE")
-    fig = cf.comparison_line_chart(df, "kbswpused", "SWAP USE", 0, rb_df)
-    return fig
+def mem(visible, refresh, relayout, dates, width):
+    on_screen("sys-mem-stats", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
 
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "MEM_STATS", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "MEMORY STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
-@app.callback(
-    dash.dependencies.Output("swap-swpused", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def swap_used_pct(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_USE")
-    fig = cf.comparison_line_chart(df, "%swpused", "SWAP USE", 0, rb_df)
-    return fig
+    return cached_figure("sys-mem-stats", dates, xrange, draw)
 
 
+# Memory use
 @app.callback(
-    dash.dependencies.Output("swap-kbswpcad", "figure"),
+    dash.dependencies.Output("sys-mem-use-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-mem-use", "relayoutData"),
     ],
-)
-def swap_cad(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_USE")
-    fig = cf.comparison_line_chart(df, "kbswpcad", "SWAP USE", 0, rb_df)
-    return fig
-
-
-@app.callback(
-    dash.dependencies.Output("swap-swpcad", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def swap_cad_pct(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_USE")
-    fig = cf.comparison_line_chart(df, "%swpcad", "SWAP USE", 0, rb_df)
-    return fig
+def mem(visible, refresh, relayout, dates, width):
+    on_screen("sys-mem-use", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
 
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "MEM_USE", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "MEMORY USE",
+            0,
+            rb_df,
+            xrange,
+        )
 
-@app.callback(
-    dash.dependencies.Output("swap-pswpin", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def swap_in(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_STATS")
-    fig = cf.comparison_line_chart(df, "pswpin/s", "SWAP STATS", 0, rb_df)
-    return fig
+    return cached_figure("sys-mem-use", dates, xrange, draw)
 
 
+# Swap stats
 @app.callback(
-    dash.dependencies.Output("swap-pswpout", "figure"),
+    dash.dependencies.Output("sys-swap-stats-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-swap-stats", "relayoutData"),
     ],
-)
-def swap_out(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "SWAP_STATS")
-    fig = cf.comparison_line_chart(df, "pswpout/s", "SWAP STATS", 0, rb_df)
-    return fig
-
-
-# Load
-# ldavg-1, ldavg-15, pct_plist, pct_blocked
-@app.callback(
-    dash.dependencies.Output("load-ldavg-1", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def load_avg_1(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "LOAD")
-    fig = cf.comparison_line_chart(df, "ldavg-1", "LOAD", 0, rb_df)
-    return fig
+def swap(visible, refresh, relayout, dates, width):
+    on_screen("sys-swap-stats", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
 
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "SWAP_STATS", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "SWAP STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
-@app.callback(
-    dash.dependencies.Output("load-ldavg-15", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
-    ],
-)
-def load_avg_15(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "LOAD")
-    fig = cf.comparison_line_chart(df, "ldavg-15", "LOAD", 0, rb_df)
-    return fig
+    return cached_figure("sys-swap-stats", dates, xrange, draw)
 
 
+# Swap use
 @app.callback(
-    dash.dependencies.Output("load-pct_plist", "figure"),
+    dash.dependencies.Output("sys-swap-use-hosts", "data"),
+    [
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-swap-use", "relayoutData"),
+    ],
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def load_plist_pct(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "LOAD")
-    load_df = uf.load_stats(df)
-    fig = cf.comparison_line_chart(load_df, "pct_plist", "LOAD", 0, rb_df)
-    return fig
+def swap(visible, refresh, relayout, dates, width):
+    on_screen("sys-swap-use", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "SWAP_USE", xrange, width)
+        return cf.system_figures(
+            conf.system_list, cf.monitoring_line_chart, df, "SWAP USE", 0, rb_df, xrange
+        )
 
+    return cached_figure("sys-swap-use", dates, xrange, draw)
 
+
+# Load
 @app.callback(
-    dash.dependencies.Output("load-pct_blocked", "figure"),
+    dash.dependencies.Output("sys-load-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-load", "relayoutData"),
+    ],
+    [
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def load_blocked_pct(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "LOAD")
-    load_df = uf.load_stats(df)
-    fig = cf.comparison_line_chart(load_df, "pct_blocked", "LOAD", 0, rb_df)
-    return fig
+def load(visible, refresh, relayout, dates, width):
+    on_screen("sys-load", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "LOAD", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "LOAD STATS",
+            0,
+            rb_df,
+            xrange,
+        )
+
+    return cached_figure("sys-load", dates, xrange, draw)
 
 
 # IO
-# tps, rtps, wtps, bread/s, bwrtn/s
 @app.callback(
-    dash.dependencies.Output("io-tps", "figure"),
+    dash.dependencies.Output("sys-io-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-io", "relayoutData"),
     ],
-)
-def io_tps(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "IO_STATS")
-    fig = cf.comparison_line_chart(df, "tps", "IO", 0, rb_df)
-    return fig
-
-
-# rtps
-@app.callback(
-    dash.dependencies.Output("io-rtps", "figure"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def io_rtps(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "IO_STATS")
-    fig = cf.comparison_line_chart(df, "rtps", "IO", 0, rb_df)
-    return fig
+def load(visible, refresh, relayout, dates, width):
+    on_screen("sys-io", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "IO_STATS", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "I/O STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
+    return cached_figure("sys-io", dates, xrange, draw)
 
-# wtps
+
+# Task
 @app.callback(
-    dash.dependencies.Output("io-wtps", "figure"),
+    dash.dependencies.Output("sys-task-hosts", "data"),
+    [
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-task", "relayoutData"),
+    ],
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def io_wtps(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "IO_STATS")
-    fig = cf.comparison_line_chart(df, "wtps", "IO", 0, rb_df)
-    return fig
+def load(visible, refresh, relayout, dates, width):
+    on_screen("sys-task", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "TASK", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "TASK STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
+    return cached_figure("sys-task", dates, xrange, draw)
 
-# bread/s
+
+# Page
 @app.callback(
-    dash.dependencies.Output("io-breads", "figure"),
+    dash.dependencies.Output("sys-page-hosts", "data"),
+    [
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-page", "relayoutData"),
+    ],
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def io_bread(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "IO_STATS")
-    fig = cf.comparison_line_chart(df, "bread/s", "IO", 0, rb_df)
-    return fig
+def load(visible, refresh, relayout, dates, width):
+    on_screen("sys-page", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "PAGE_STATS", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "PAGE STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
+    return cached_figure("sys-page", dates, xrange, draw)
 
-# bwrtn/s
+
+# Inodes
 @app.callback(
-    dash.dependencies.Output("io-bwrtns", "figure"),
+    dash.dependencies.Output("sys-h-page-hosts", "data"),
+    [
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-h-page", "relayoutData"),
+    ],
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def io_bwrtn(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "IO_STATS")
-    fig = cf.comparison_line_chart(df, "bwrtn/s", "IO", 0, rb_df)
-    return fig
+def load(visible, refresh, relayout, dates, width):
+    on_screen("sys-h-page", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
+
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "INODE", xrange, width)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df,
+            "INODE STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
+    return cached_figure("sys-h-page", dates, xrange, draw)
 
-# Network
+
+# Network Activity
 @app.callback(
-    dash.dependencies.Output("net-rxpck", "figure"),
+    dash.dependencies.Output("sys-network-hosts", "data"),
     [
-        dash.dependencies.Input("comp-day-picker", "value"),
+        dash.dependencies.Input("sys-visible", "data"),
+        dash.dependencies.Input("live-refresh", "n_intervals"),
+        dash.dependencies.Input("sys-iface", "value"),
+        dash.dependencies.Input("sys-network", "relayoutData"),
+    ],
+    [
+        dash.dependencies.State("sys-dates", "data"),
+        dash.dependencies.State("viewport", "data"),
     ],
 )
-def net_rxpck(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "NETWORK_ACTIVITY")
-    df1 = df.loc[df["IFACE"] == "eth0"]
-    fig = cf.comparison_line_chart(df1, "rxpck/s", "NETWORK", 0, rb_df)
-    return fig
+def load(visible, refresh, iface, relayout, dates, width):
+    on_screen("sys-network", visible)
+    skip_refresh(dates)
+    xrange = zoom_range(relayout)
 
+    def draw():
+        rb_df = load_reboots(dates)
+        df = load_section(dates, "NETWORK_ACTIVITY", xrange, width)
+        df1 = one_interface(df, iface)
+        return cf.system_figures(
+            conf.system_list,
+            cf.monitoring_line_chart,
+            df1,
+            "NETWORK ACTIVITY STATS",
+            0,
+            rb_df,
+            xrange,
+        )
 
-@app.callback(
-    dash.dependencies.Output("net-txpck", "figure"),
-    [
-        dash.dependencies.Input("comp-day-picker", "value"),
+    return cached_figure("sys-network", dates, xrange, draw, iface)
+
+
+####################################################
+#  Comparisons
+####################################################
+# Each comparison page is one callback: the sections it needs are loaded
+# once and every chart on the page is drawn from them.  A zoom on one chart
+# only redraws that chart.
+# Each chart is (graph id, section, column, title).
+comparison_pages = {
+    # usr, sys, iowait, soft, nice, idle
+    "cpu": [
+        ("cpu-usr", "CPU", "%usr", "CPU"),
+        ("cpu-sys", "CPU", "%sys", "CPU"),
+        ("cpu-iowait", "CPU", "%iowait", "CPU"),
+        ("cpu-soft", "CPU", "%soft", "CPU"),
+        ("cpu-idle", "CPU", "%idle", "CPU"),
+        ("cpu-nice", "CPU", "%nice", "CPU"),
     ],
-)
-def net_txpck(day):
-    rb_df = uf.get_reboots(conf.file_locations, day)
-    df = uf.get_section_all_files(conf.file_locations, day, "NETWORK_ACTIVITY")
-    df1 = df.loc[df["IFACE"] == "eth0"]
-    fig = cf.comparison_line_chart(df1, "txpck/s", "NETWORK", 0, rb_df)
-    return fig
+    # free, used, buffers, cached, commit, active, inactive, dirty
+    "mem": [
+        ("mem-kbmemfree", "MEM_USE", "kbmemfree", "MEM USE"),
+        ("mem-kbmemused", "MEM_USE", "kbmemused", "MEM USE"),
+        ("mem-kbbuffers", "MEM_USE", "kbbuffers", "MEM USE"),
+        ("mem-kbcached", "MEM_USE", "kbcached", "MEM USE"),
+        ("mem-kbcommit", "MEM_USE", "kbcommit", "MEM USE"),
+        ("mem-kbactive", "MEM_USE", "kbactive", "MEM USE"),
+        ("mem-kbinact", "MEM_USE", "kbinact", "MEM USE"),
+        ("mem-kbdirty", "MEM_USE", "kbdirty", "MEM USE"),
+    ],
+    # free, used, used %, cad, cad %, in, out
+    "swap": [
+        ("swap-kbswpfree", "SWAP_USE", "kbswpfree", "SWAP USE"),
+        ("swap-kbswpused", "SWAP_USE", "kbswpused", "SWAP USE"),
+        ("swap-swpused", "SWAP_USE", "%swpused", "SWAP USE"),
+        ("swap-kbswpcad", "SWAP_USE", "kbswpcad", "SWAP USE"),
+        ("swap-swpcad", "SWAP_USE", "%swpcad", "SWAP USE"),
+        ("swap-pswpin", "SWAP_STATS", "pswpin/s", "SWAP STATS"),
+        ("swap-pswpout", "SWAP_STATS", "pswpout/s", "SWAP STATS"),
+    ],
+    # ldavg-1, ldavg-15, pct_plist, pct_blocked
+    "load": [
+        ("load-ldavg-1", "LOAD", "ldavg-1", "LOAD"),
+        ("load-ldavg-15", "LOAD", "ldavg-15", "LOAD"),
+        ("load-pct_plist", "LOAD", "pct_plist", "LOAD"),
+        ("load-pct_blocked", "LOAD", "pct_blocked", "LOAD"),
+    ],
+    # tps, rtps, wtps, bread/s, bwrtn/s
+    "io": [
+        ("io-tps", "IO_STATS", "tps", "IO"),
+        ("io-rtps", "IO_STATS", "rtps", "IO"),
+        ("io-wtps", "IO_STATS", "wtps", "IO"),
+        ("io-breads", "IO_STATS", "bread/s", "IO"),
+        ("io-bwrtns", "IO_STATS", "bwrtn/s", "IO"),
+    ],
+    # rxpck/s, txpck/s
+    "net": [
+        ("net-rxpck", "NETWORK_ACTIVITY", "rxpck/s", "NETWORK"),
+        ("net-txpck", "NETWORK_ACTIVITY", "txpck/s", "NETWORK"),
+    ],
+}
+
+
+# Pages with a selector (like the interface) feeding the charts
+comparison_choices = {
+    "net": "comp-iface",
+}
+
+
+# Sections that need work done before they can be charted, given the page's
+# selection if it has one
+comparison_prepare = {
+    "CPU": lambda df, choice: all_cpus(df),
+    "NETWORK_ACTIVITY": one_interface,
+}
+
+
+def comparison_callback(charts, choice=None):
+    choices = [] if choice is None else [dash.dependencies.Input(choice, "value")]
+
+    @app.callback(
+        [dash.dependencies.Output(i[0] + "-packed", "data") for i in charts],
+        [dash.dependencies.Input("comp-visible", "data")]
+        + choices
+        + [dash.dependencies.Input(i[0], "relayoutData") for i in charts],
+        [
+            dash.dependencies.State("comp-dates", "data"),
+            dash.dependencies.State("viewport", "data"),
+        ],
+    )
+    def comparison(visible, *values):
+        selected = values[0] if choices else None
+        relayouts = values[len(choices) : -2]
+        dates, width = values[-2:]
+        if not visible:
+            raise PreventUpdate
+
+        # Draw the charts that just came into view, or only the ones that
+        # were zoomed if that's what fired.  visible is left over from the
+        # last scroll then.  A new choice (interface...) redraws every chart
+        # on screen.
+        triggered = [i["prop_id"] for i in dash.callback_context.triggered]
+        zooms = {
+            i[: -len(".relayoutData")] for i in triggered if i.endswith(".relayoutData")
+        }
+        wanted = zooms if zooms else set(visible["new"])
+        if any(not i.endswith((".relayoutData", "-visible.data")) for i in triggered):
+            wanted |= set(visible["seen"])
+        if not wanted & {i[0] for i in charts}:
+            raise PreventUpdate
+
+        # Sections and restarts are only loaded for charts not in the cache
+        frames = {}
+
+        def frame(section, xrange):
+            key = (section, None if xrange is None else tuple(xrange))
+            if key not in frames:
+                df = load_section(dates, section, xrange, width)
+                if section in comparison_prepare:
+                    df = comparison_prepare[section](df, selected)
+                frames[key] = df
+
+            return frames[key]
+
+        figures = []
+        for (graph, section, param, title), relayout in zip(charts, relayouts):
+            if graph not in wanted:
+                figures.append(dash.no_update)
+                continue
+
+            # A chart change that isn't a zoom leaves just that chart alone
+            still_current(dates)
+            xrange = None
+            if graph in zooms:
+                try:
+                    xrange = zoom_range(relayout)
+                except PreventUpdate:
+                    figures.append(dash.no_update)
+                    continue
+
+            def draw():
+                if "REBOOTS" not in frames:
+                    frames["REBOOTS"] = load_reboots(dates)
+                df = frame(section, xrange)
+                rb_df = frames["REBOOTS"]
+                fig = cf.comparison_line_chart(df, param, title, 0, rb_df, xrange)
+                return cf.pack_figure(fig)
+
+            figures.append(cached_figure(graph, dates, xrange, draw, selected))
+
+        if all(i is dash.no_update for i in figures):
+            raise PreventUpdate
+        return figures
+
+    # The figures are sent packed (see cf.pack_figure) and unpacked in the
+    # browser
+    for graph in charts:
+        app.clientside_callback(
+            ClientsideFunction(namespace="clientside", function_name="unpack"),
+            Output(graph[0], "figure"),
+            Input(graph[0] + "-packed", "data"),
+        )
+
+    return comparison
+
+
+for name, page in comparison_pages.items():
+    comparison_callback(page, comparison_choices.get(name))
 
 
 ###################################################
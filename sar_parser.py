@@ -1,5 +1,11 @@
+import io
+import mmap
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+import re
+import shutil
+import subprocess
+from datetime import datetime
 import os
 
 """
@@ -9,7 +15,7 @@ import os
     Rewritten to handle server restarts and not take quite a linear
     approach to reading the file itself.
 
-    parse_date and format_time are copied.  Parsefile is well influenced.
+    parse_date is copied.  Parsefile is well influenced.
 """
 
 # Header string definitions
@@ -38,6 +44,18 @@ sockets_header = (
     "12:00:01 AM    totsck    tcpsck    udpsck    rawsck   ip-frag    tcp-tw"
 )
 
+# Headers that changed in later sysstat releases
+io_stats_header_v12 = "12:00:01 AM       tps      rtps      wtps      dtps   bread/s   bwrtn/s   bdscd/s"
+mem_use_header_v11 = "12:00:01 AM kbmemfree   kbavail kbmemused  %memused kbbuffers  kbcached  kbcommit   %commit  kbactive   kbinact   kbdirty"
+# sar -r ALL from sysstat 11.5 on
+mem_use_header_v11_all = "12:00:01 AM kbmemfree   kbavail kbmemused  %memused kbbuffers  kbcached  kbcommit   %commit  kbactive   kbinact   kbdirty  kbanonpg    kbslab  kbkstack   kbpgtbl  kbvmused"
+hugepages_header_v12 = (
+    "12:00:01 AM kbhugfree kbhugused  %hugused kbhugrsvd kbhugsurp"
+)
+block_device_header_v11 = "12:00:01 AM       DEV       tps     rkB/s     wkB/s   areq-sz    aqu-sz     await     svctm     %util"
+block_device_header_v12 = "12:00:01 AM       DEV       tps     rkB/s     wkB/s     dkB/s   areq-sz    aqu-sz     await     %util"
+network_activity_header_v11 = "12:00:01 AM     IFACE   rxpck/s   txpck/s    rxkB/s    txkB/s   rxcmp/s   txcmp/s  rxmcst/s   %ifutil"
+
 # Function to parse the date
 def parse_date(startdate_str):
     """parse the date SAR collection started"""
@@ -52,146 +70,770 @@ def parse_date(startdate_str):
         raise Exception("Unknown date format: %s" % startdate_str)
 
 
-# Function to format the time / date for a SAR log file
-def format_time(startdate, timestr, afternoon):
-    """format the timstr as a datetime str"""
-    datetime_str = "%s-%s-%s %s %s" % (
-        startdate.year,
-        startdate.month,
-        startdate.day,
-        timestr,
-        afternoon,
+# Function to build the timestamps for a run of SAR rows in one go
+def build_datetimes(startdate, times, meridiems, previous=None):
+    """
+    startdate: the date SAR collection started
+    times: list of the "hh:mm:ss" time strings, one per row
+    meridiems: list of the matching AM / PM markers, "" for a 24 hour clock
+    previous: AM / PM marker of the row before these when carrying on from
+        an earlier read.  startdate is then the date of that row.
+
+    Returns a datetime64[ns] array.  A row marked AM straight after a PM row
+    has crossed midnight, so every row from there on moves up a day.
+    Times from a 24 hour clock count as AM before noon and PM after.
+    """
+    # Fixed width "hh:mm:ss" strings, so read the digits straight out
+    digits = np.array(times, dtype="S8").view(np.uint8).reshape(-1, 8)
+    digits = digits.astype(np.int64) - ord("0")
+    seconds = (
+        (digits[:, 0] * 10 + digits[:, 1]) * 3600
+        + (digits[:, 3] * 10 + digits[:, 4]) * 60
+        + digits[:, 6] * 10
+        + digits[:, 7]
     )
-    timedate = datetime.strptime(datetime_str, "%Y-%m-%d %I:%M:%S %p")
-    return datetime.strftime(timedate, "%Y-%m-%dT%H:%M:%S")
+
+    # 12 AM is hour 0 and 12 PM is hour 12
+    meridiems = np.array(meridiems)
+    clock24 = meridiems == ""
+    pm = np.where(clock24, seconds >= 12 * 3600, meridiems == "PM")
+    seconds = np.where(clock24, seconds, seconds % (12 * 3600) + pm * (12 * 3600))
+
+    rollover = np.zeros(len(seconds), dtype=np.int64)
+    rollover[1:] = ~pm[1:] & pm[:-1]
+    if len(rollover) and previous == "PM" and not pm[0]:
+        rollover[0] = 1
+    seconds += np.cumsum(rollover) * (24 * 3600)
+
+    start = np.datetime64(startdate.strftime("%Y-%m-%d"), "ns")
+    return start + seconds.astype("timedelta64[s]")
+
+
+# Function to turn a run of text rows into a block of numbers
+def convert_values(rows, width, dtype=np.float64):
+    try:
+        block = np.array(rows, dtype=dtype)
+    except ValueError:
+        # Something in there isn't a number, so go column by column and
+        # let the odd values fall out as NaN
+        block = pd.DataFrame(rows).apply(pd.to_numeric, errors="coerce")
+        block = block.to_numpy(dtype=dtype)
+
+    return block.reshape(-1, width)
 
 
 # Function to convert the returns to a dataframe
-def convert_to_dataframe(master_list):
-    df = pd.DataFrame(master_list[1:], columns=master_list[0])
+def convert_to_dataframe(columns, datetimes, keys, values):
+    """
+    columns: the column names, time label first
+    datetimes: the timestamp of each row
+    keys: the identifier (CPU, DEV, ...) of each row, or None
+    values: 2D array of the numeric columns
+    """
+    df = pd.DataFrame(values, columns=columns[len(columns) - values.shape[1] :])
+    if keys is not None:
+        df.insert(0, columns[1], pd.Categorical(keys))
+    df.insert(0, columns[0], datetimes)
+    return df
+
+
+# LOAD figures as a share of the process list
+def pct_plist(df):
+    return (df["runq-sz"] / df["plist-sz"]) * 100
+
+
+def pct_blocked(df):
+    return (df["blocked"] / df["plist-sz"]) * 100
+
+
+#############################################################################
+# Section registry
+#############################################################################
+# Everything the parser needs to know about a section, by name:
+#   headers: the header lines sar prints for it, oldest sysstat first.
+#       Newer releases add, drop or rename columns.  Any of the headers is
+#       recognized and the frame gets the columns of the one that was found.
+#   key: the identifier column (CPU, DEV, ...) kept as text, or None
+#   filter: the identifiers to keep, None for every row.  On some reports,
+#       like CPU, we only want the aggregate row.
+#   dtype: type of the numeric columns
+#   derived: extra columns worked out from the others, name to function
+section_registry = {
+    "CPU": {
+        "headers": [cpu_header],
+        "key": "CPU",
+        "filter": ["all"],
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "TASK": {
+        "headers": [task_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "SWAP_STATS": {
+        "headers": [swap_stats_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "PAGE_STATS": {
+        "headers": [paging_stats_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "IO_STATS": {
+        "headers": [io_stats_header, io_stats_header_v12],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "MEM_STATS": {
+        "headers": [mem_stats_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "MEM_USE": {
+        "headers": [mem_use_header, mem_use_header_v11, mem_use_header_v11_all],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "SWAP_USE": {
+        "headers": [swap_use_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "HUGEPAGES": {
+        "headers": [hugepages_header, hugepages_header_v12],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "INODE": {
+        "headers": [inode_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "LOAD": {
+        "headers": [load_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {"pct_plist": pct_plist, "pct_blocked": pct_blocked},
+    },
+    "TTY": {
+        "headers": [tty_header],
+        "key": "TTY",
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "BLOCK": {
+        "headers": [
+            block_device_header,
+            block_device_header_v11,
+            block_device_header_v12,
+        ],
+        "key": "DEV",
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "NETWORK_ACTIVITY": {
+        "headers": [network_activity_header, network_activity_header_v11],
+        "key": "IFACE",
+        "filter": ["eth0", "lo"],
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "NETWORK_ERROR": {
+        "headers": [network_error_header],
+        "key": "IFACE",
+        "filter": ["eth0", "lo"],
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "NFS_CLIENT": {
+        "headers": [nfs_client_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "NFS_SERVER": {
+        "headers": [nfs_server_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+    "SOCKETS": {
+        "headers": [sockets_header],
+        "key": None,
+        "filter": None,
+        "dtype": np.float64,
+        "derived": {},
+    },
+}
+
+# Lookups compiled from the registry
+
+# Section name to (oldest) header definition
+section_headers = {
+    section: spec["headers"][0] for section, spec in section_registry.items()
+}
+
+# Sections that only keep some of their rows
+section_filters = {
+    section: spec["filter"]
+    for section, spec in section_registry.items()
+    if spec["filter"] is not None
+}
+
+# Reports with one row per device, etc.  The first column holds the
+# identifier and is kept as text, everything else is numeric.
+key_columns = {
+    spec["key"] for spec in section_registry.values() if spec["key"] is not None
+}
+
+# Header signature (everything after the time label) to section name, for
+# every header of every section.  Lets a single pass through the file
+# recognize any section header with one dictionary lookup.
+header_lookup = {
+    tuple(header.split()[2:]): section
+    for section, spec in section_registry.items()
+    for header in spec["headers"]
+}
+
+# 12 hour clocks mark each time with AM / PM, 24 hour clocks don't
+meridiem_marks = {"AM", "PM"}
+
+
+# Add the derived columns of a section to a freshly built frame
+def add_derived(section, df):
+    for name, func in section_registry[section]["derived"].items():
+        df[name] = func(df)
+
     return df
 
 
+# Columns of the restart records handed back under "REBOOTS"
+restart_columns = ["datetime", "os", "action"]
+
+# Rows are turned into numbers this many at a time, so the raw text of a
+# big section never has to be held in memory all at once
+CHUNK_ROWS = 4096
+
 # Main function to parse data from sar log file (text)
 def parsefile(filename, section, dataframe=1):
+    sections = parse_sections(filename, [section], dataframe)
+    if sections is None:
+        return
+
+    return sections[section]
+
+
+# Pull every requested section out of a sar log file
+# Returns a dictionary of section name to dataframe (or list of rows), plus
+# the LINUX RESTART records found on the way under "REBOOTS"
+# Only the blocks of the requested sections are read, using the index from
+# build_index (built here if one isn't passed in).
+# filters is section name to the identifiers to keep, section_filters if
+# not given.  Pass {} to keep every CPU, device and interface row.
+def parse_sections(filename, sections=None, dataframe=1, index=None, filters=None):
     # Check for file to exist
     if not os.path.exists(filename):
         print("File not found")
         return
 
-    # Container to hold the return values
-    retvals = []
-
-    # Figure out what report we're working with
-    # On some, like CPU, we only want the aggregate row
-    # This behavior can be modified if needs dictate.
-    if section == "CPU":
-        headermap = cpu_header
-        filter_tag = ["all"]
-    if section == "TASK":
-        headermap = task_header
-        exception = swap_stats_header.split()
-    if section == "SWAP_STATS":
-        headermap = swap_stats_header
-    if section == "PAGE_STATS":
-        headermap = paging_stats_header
-    if section == "IO_STATS":
-        headermap = io_stats_header
-    if section == "MEM_STATS":
-        headermap = mem_stats_header
-    if section == "MEM_USE":
-        headermap = mem_use_header
-    if section == "SWAP_USE":
-        headermap = swap_use_header
-    if section == "HUGEPAGES":
-        headermap = hugepages_header
-    if section == "INODE":
-        headermap = inode_header
-    if section == "LOAD":
-        headermap = load_header
-    if section == "TTY":
-        headermap = tty_header
-    if section == "BLOCK":
-        headermap = block_device_header
-    if section == "NETWORK_ACTIVITY":
-        headermap = network_activity_header
-        filter_tag = ["eth0", "lo"]
-    if section == "NETWORK_ERROR":
-        headermap = network_error_header
-        filter_tag = ["eth0", "lo"]
-    if section == "NFS_CLIENT":
-        headermap = nfs_client_header
-    if section == "NFS_SERVER":
-        headermap = nfs_server_header
-    if section == "SOCKETS":
-        headermap = sockets_header
-
-    header_list = headermap.split()
+    if sections is None:
+        sections = list(section_headers)
 
     with open(filename, "r") as _file:
-        # create a header string comprised of the base header + the time label
-        headerstr = ["datetime"] + header_list[2:]
-        retvals.append(headerstr)
-
         # Read very first line and extract into elements to get the date
         header = _file.readline()
         header = header.split()
         # Run the extracted date through the function and get result
         startdate = parse_date(header[3])
 
-        pm = False
-        target_area = 0
-        for line in _file:
-            # Make sure the line isn't a throwaway - if so, move on
-            if line == "\n" or "Average" in line or "Summary" in line:
-                continue
+    if index is None:
+        index = build_index(filename)
+    scan = scan_blocks(filename, index, sections, filters)
 
-            # Grab the line and turn it into a list
-            vals = line.split()
+    # Sections are written one after the other and each starts back at
+    # midnight, so every section works out its own day rollover.
+    return_var = {}
+    restarts = []
+    for section in sections:
+        return_var[section], found = build_frame(scan[section], startdate)
+        restarts.append(found)
+    return_var["REBOOTS"] = combine_restarts(restarts)
+
+    if dataframe != 1:
+        # Plain rows were asked for, with the time as an ISO string
+        for section, df in return_var.items():
+            stamps = np.datetime_as_string(df["datetime"].to_numpy(), unit="s")
+            df = df.assign(datetime=stamps)
+            return_var[section] = [list(df.columns)] + df.values.tolist()
 
-            # On the first run, we are at the top of the file
-            # we need should be staring down at a header line
-            # we need to compare and mark whether we care about the section or
-            # whether it can be ignored
-            if len(vals) == len(header_list):
-                if section == "TASK" and vals[2:] == exception[2:]:
-                    target_area = 0
-                    continue
-
-                if vals[2:] == header_list[2:]:
-                    target_area = 1
-                    continue
-
-                if target_area == 1:
-                    if section in {"CPU", "NETWORK_ACTIVITY", "NETWORK_ERROR"}:
-                        if vals[2] not in filter_tag:
-                            continue
-
-                    if vals[1] == "PM":
-                        if not pm:
-                            pm = True
-                    elif vals[1] == "AM" and pm:
-                        startdate = startdate + timedelta(days=1)
-                        pm = False
-
-                    return_candidate = [
-                        format_time(startdate, vals[0], vals[1])
-                    ] + vals[2:]
-                    retvals.append(return_candidate)
+    return return_var
+
+
+# Containers to collect the rows of each section in, one per section.
+# The time and AM/PM of each row are held to the side and turned into
+# timestamps once the whole section has been read.  Numbers are collected
+# as text and converted to arrays a chunk at a time.
+def new_scan(sections, filters=None):
+    if filters is None:
+        filters = section_filters
+
+    scan = {}
+    for section in sections:
+        header_list = section_headers[section].split()
+        scan[section] = {
+            "section": section,
+            "columns": ["datetime"] + header_list[2:],
+            "width": len(header_list),
+            "dtype": section_registry[section]["dtype"],
+            "filter": filters.get(section),
+            "times": [],
+            "meridiems": [],
+            "keys": [] if header_list[2] in key_columns else None,
+            "pending": [],
+            "values": [],
+            "restarts": [],
+        }
+
+    return scan
+
+
+# Set a section up for the header version found in the file
+# Returns False if rows were already collected under a different version,
+# in which case the rows that follow won't fit and get skipped.
+def use_header(target, signature):
+    columns = ["datetime"] + list(signature)
+    if columns == target["columns"]:
+        return True
+    if target["times"] or target["values"] or target["pending"]:
+        return False
+
+    target["columns"] = columns
+    target["width"] = len(signature) + 2
+    return True
+
+
+# Collect the rows of every requested section from a run of text lines
+# current is the section the lines start out in, if carrying on from an
+# earlier read.  Rows are added to scan if given, otherwise a new one
+# using filters (see parse_sections).
+# Returns the collected rows and the section we ended in.
+def scan_lines(lines, sections, current=None, scan=None, filters=None):
+    if scan is None:
+        scan = new_scan(sections, filters)
+    if current not in scan:
+        current = None
+
+    # The section a restart line would belong to.  A blank line ends the
+    # rows of a section, but a restart after it still falls in the section.
+    last = current
+
+    for line in lines:
+        # A blank line closes out the section, the next line starts a block
+        if line == "\n":
+            current = None
+            continue
+
+        # Make sure the line isn't a throwaway - if so, move on
+        if "Average" in line or "Summary" in line:
+            continue
+
+        # Grab the line and turn it into a list
+        vals = line.split()
+
+        # A 24 hour clock has no AM / PM, put in a blank one so the
+        # fields line up the same either way
+        if len(vals) > 1 and vals[1] not in meridiem_marks:
+            vals.insert(1, "")
+
+        # A header line tells us which section the following rows
+        # belong to.  Sections we weren't asked for are skipped.
+        signature = tuple(vals[2:])
+        if signature in header_lookup:
+            current = header_lookup[signature]
+            if current not in scan:
+                current = None
             else:
-                target_area = 0
+                use_header(scan[current], signature)
+            last = current
+            continue
+
+        # Restarts are noted where they fall in the section so they get
+        # its day rollover
+        if len(vals) > 3 and vals[3] == "RESTART":
+            if last is not None:
+                target = scan[last]
+                target["restarts"].append(
+                    (len(target["times"]), vals[0], vals[1], vals[2:4])
+                )
+            current = last
+            continue
+
+        # Anything else that doesn't fit the section closes it out,
+        # including the headers of sections we don't know
+        if current is None or len(vals) != scan[current]["width"]:
+            current = None
+            last = None
+            continue
+
+        target = scan[current]
+        filter_tag = target["filter"]
+        if filter_tag is not None and vals[2] not in filter_tag:
+            continue
+
+        target["times"].append(vals[0])
+        target["meridiems"].append(vals[1])
+        rows = target["pending"]
+        if target["keys"] is None:
+            rows.append(vals[2:])
+        else:
+            target["keys"].append(vals[2])
+            rows.append(vals[3:])
+
+        if len(rows) == CHUNK_ROWS:
+            target["values"].append(
+                convert_values(rows, len(rows[0]), target["dtype"])
+            )
+            rows.clear()
+
+    return scan, current
+
+
+# Turn the rows collected for one section into a dataframe
+# Returns a tuple of (dataframe, restarts seen in the section)
+def build_frame(target, startdate, previous=None):
+    times = target["times"]
+    meridiems = target["meridiems"]
+
+    # Restarts are timed along with the rows they sit between
+    restarts = target["restarts"]
+    at = np.array([i[0] for i in restarts], dtype=np.int64)
+    if len(at):
+        times = np.insert(np.array(times, dtype="S8"), at, [i[1] for i in restarts])
+        meridiems = np.insert(
+            np.array(meridiems, dtype="U2"), at, [i[2] for i in restarts]
+        )
+    datetimes = build_datetimes(startdate, times, meridiems, previous)
+    is_restart = np.zeros(len(datetimes), dtype=bool)
+    is_restart[at + np.arange(len(at))] = True
+
+    width = len(target["columns"]) - 1
+    if target["keys"] is not None:
+        width -= 1
+    pending = convert_values(target["pending"], width, target["dtype"])
+    values = target["values"] + [pending]
+
+    df = convert_to_dataframe(
+        target["columns"],
+        datetimes[~is_restart],
+        target["keys"],
+        np.concatenate(values),
+    )
+    df = add_derived(target["section"], df)
+    found = pd.DataFrame([i[3] for i in restarts], columns=restart_columns[1:])
+    found.insert(0, "datetime", datetimes[is_restart])
+
+    return df, found
+
+
+# A restart shows up in every section of the log, keep one of each
+def combine_restarts(frames):
+    frames = [df for df in frames if not df.empty]
+    if not frames:
+        df = pd.DataFrame(columns=restart_columns[1:])
+        df.insert(0, "datetime", np.array([], dtype="datetime64[ns]"))
+        return df
+
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates("datetime").sort_values("datetime", ignore_index=True)
+
+
+#############################################################################
+# Section index
+#############################################################################
+# Where every section block sits in a sar text file, so a section can be
+# read without going through the rest of the file.  A block is a header
+# line plus the rows under it, up to the blank line or averages that end
+# it.  Sections show up again after a restart, so one section can have
+# several blocks.  Restart lines are indexed along with the section they
+# interrupt.
+#   {"blocks": [[section, start, end, rows], ...],
+#    "restarts": [[section, start, end], ...]}
+# start and end are byte offsets, rows counts the rows before filtering.
+# The index is plain lists and numbers so it can be stored as JSON.
+#
+# The file is memory mapped and searched as raw bytes, so the only lines
+# ever decoded and split are the ones inside blocks that are being read.
+
+# Same as header_lookup, for matching lines that haven't been decoded
+header_lookup_bytes = {
+    tuple(i.encode() for i in signature): section
+    for signature, section in header_lookup.items()
+}
+
+# A header line: the time, then one of the known column lists
+header_pattern = re.compile(
+    rb"[0-9:]+(?:[ \t]+[AP]M)?[ \t]+("
+    + b"|".join(
+        rb"[ \t]+".join(re.escape(i) for i in signature)
+        for signature in sorted(header_lookup_bytes, key=len, reverse=True)
+    )
+    + rb")[ \t]*\n"
+)
+
+restart_pattern = re.compile(rb"[0-9:]+(?:[ \t]+[AP]M)?[ \t]+LINUX RESTART")
+
+
+# Build the index of a sar text file
+# sar puts a blank line in front of every header and restart, so only the
+# line after each blank line needs looking at.  The averages at the end of
+# a section aren't part of its block.
+def build_index(filename):
+    blocks = []
+    restarts = []
+    if os.path.getsize(filename) == 0:
+        return {"blocks": blocks, "restarts": restarts}
+
+    with open(filename, "rb") as _file, mmap.mmap(
+        _file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        size = len(data)
+        current = None
+        blank = data.find(b"\n\n")
+        while blank >= 0:
+            start = blank + 2
+            while start < size and data[start : start + 1] == b"\n":
+                start += 1
+            blank = data.find(b"\n\n", start)
+            end = size if blank < 0 else blank + 1
+
+            match = header_pattern.match(data, start)
+            if match is not None:
+                current = header_lookup_bytes[tuple(match.group(1).split())]
+                for totals in (b"\nAverage", b"\nSummary"):
+                    found = data.find(totals, start, end)
+                    end = end if found < 0 else found + 1
+                rows = data[start:end].count(b"\n") - 1
+                blocks.append([current, start, end, rows])
                 continue
 
-    if dataframe == 1:
-        return_var = convert_to_dataframe(retvals)
+            # Restarts belong to the section they interrupt.  Anything else
+            # starts a block of a section we don't know, which ends it.
+            if restart_pattern.match(data, start) is None:
+                current = None
+            elif current is not None:
+                restarts.append([current, start, data.find(b"\n", start) + 1])
+
+    return {"blocks": blocks, "restarts": restarts}
+
+
+# Work out which sections to read from an indexed file
+# "REBOOTS" may be asked for along with the sections.  Restarts are timed
+# from the section they sit in, so if none of the sections asked for has
+# one, the smallest section that does gets read as well.
+def index_sections(index, sections):
+    wanted = [i for i in sections if i in section_headers]
+    if "REBOOTS" not in sections:
+        return wanted
+
+    restart_sections = {i[0] for i in index["restarts"]}
+    if not restart_sections or restart_sections.intersection(wanted):
+        return wanted
+
+    # Counted in registry order so ties always go the same way
+    rows = {section: 0 for section in section_registry if section in restart_sections}
+    for section, _, _, count in index["blocks"]:
+        if section in rows:
+            rows[section] += count
+
+    return wanted + [min(rows, key=rows.get)]
+
+
+# Collect the rows of the given sections from an indexed file
+# Same result as scan_lines, but each block is decoded and split in one go
+# rather than a line at a time.
+def scan_blocks(filename, index, sections, filters=None):
+    scan = new_scan(sections, filters)
+    spans = [(i[1], i[2], i[0]) for i in index["blocks"] if i[0] in scan]
+    restarts = {i[1] for i in index["restarts"] if i[0] in scan}
+    spans += [(i[1], i[2], i[0]) for i in index["restarts"] if i[0] in scan]
+    if not spans:
+        return scan
+
+    with open(filename, "rb") as _file, mmap.mmap(
+        _file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        for start, end, section in sorted(spans):
+            text = data[start:end].decode()
+            if start in restarts:
+                scan_lines([text], list(scan), section, scan)
+            elif not scan_block(scan[section], section, text):
+                scan_lines(io.StringIO(text), list(scan), None, scan)
+
+    return scan
+
+
+# Add the rows of one block (header line included) to its section
+# Returns False, having added nothing, if the rows don't all have the
+# expected number of fields.  scan_lines sorts those blocks out.
+def scan_block(target, section, text):
+    header, _, body = text.partition("\n")
+    rows = body.count("\n")
+    if body and not body.endswith("\n"):
+        rows += 1
+
+    # The time takes one field on a 24 hour clock and two with AM / PM
+    header = header.split()
+    lead = 2 if header[1] in meridiem_marks else 1
+    if not use_header(target, tuple(header[lead:])):
+        return False
+    if rows == 0:
+        return True
+
+    width = target["width"] - 2 + lead
+    fields = body.split()
+    if len(fields) != rows * width:
+        return False
+
+    grid = np.array(fields, dtype=object).reshape(rows, width)
+    filter_tag = target["filter"]
+    if filter_tag is not None:
+        grid = grid[np.isin(grid[:, lead], filter_tag)]
+
+    target["times"].extend(grid[:, 0].tolist())
+    if lead == 2:
+        target["meridiems"].extend(grid[:, 1].tolist())
     else:
-        return_var = retvals
+        target["meridiems"].extend([""] * len(grid))
+    first = lead
+    if target["keys"] is not None:
+        target["keys"].extend(grid[:, lead].tolist())
+        first += 1
 
-    return return_var
+    # Anything left over from scan_lines goes first to keep the row order
+    dtype = target["dtype"]
+    if target["pending"]:
+        pending = target["pending"]
+        target["values"].append(convert_values(pending, len(pending[0]), dtype))
+        pending.clear()
+    target["values"].append(convert_values(grid[:, first:], width - first, dtype))
+
+    return True
+
+
+# How many bytes before the read position are remembered when following a
+# file, to make sure it has only been added to since the last read
+FOLLOW_MARK = 64
+
+
+# Incremental version of parse_sections for a log that's still being written
+def follow_sections(filename, state=None, filters=None):
+    """
+    filename: the sar text log to read
+    state: what the previous call handed back, or None to start fresh
+    filters: rows to keep, see parse_sections.  Use the same every call.
+
+    Returns a tuple of (dictionary of section name to dataframe, state).
+    Only the bytes added since the last call are parsed.  If the file has
+    been replaced or cut short, it's read again from the top.
+    """
+    with open(filename, "rb") as _file:
+        if state is not None:
+            _file.seek(max(state["offset"] - len(state["mark"]), 0))
+            if _file.read(len(state["mark"])) != state["mark"]:
+                state = None
+
+        if state is None:
+            _file.seek(0)
+            header = _file.readline()
+            state = {
+                "offset": _file.tell(),
+                "mark": header[-FOLLOW_MARK:],
+                "startdate": parse_date(header.decode().split()[3]),
+                "current": None,
+                "frames": {},
+            }
+
+        _file.seek(state["offset"])
+        data = _file.read()
+
+    # Leave any half written line for next time, along with blank lines at
+    # the end so they get read with the block they start
+    data = data[: data.rfind(b"\n") + 1]
+    data = data[: len(data.rstrip(b"\n")) + 1] if data.strip(b"\n") else b""
+    scan, current = scan_lines(
+        io.StringIO(data.decode()),
+        list(section_headers),
+        state["current"],
+        filters=filters,
+    )
+
+    frames = {}
+    restarts = [state["frames"].get("REBOOTS", combine_restarts([]))]
+    for section, target in scan.items():
+        old = state["frames"].get(section)
+        if old is None or old.empty:
+            new, found = build_frame(target, state["startdate"])
+            restarts.append(found)
+            frames[section] = old if old is not None and new.empty else new
+            continue
+
+        # Pick the day rollover back up from the last row we already have
+        last = old["datetime"].iloc[-1]
+        previous = "PM" if last.hour >= 12 else "AM"
+        new, found = build_frame(target, last.normalize(), previous)
+        restarts.append(found)
+        if new.empty:
+            frames[section] = old
+            continue
+
+        df = pd.concat([old, new], ignore_index=True)
+        if new.columns[1] in key_columns:
+            df[new.columns[1]] = df[new.columns[1]].astype("category")
+        frames[section] = df
+    if any(not df.empty for df in restarts[1:]):
+        frames["REBOOTS"] = combine_restarts(restarts)
+    else:
+        frames["REBOOTS"] = restarts[0]
+
+    state = {
+        "offset": state["offset"] + len(data),
+        "mark": (state["mark"] + data)[-FOLLOW_MARK:],
+        "startdate": state["startdate"],
+        "current": current,
+        "frames": frames,
+    }
+
+    return frames, state
 
 
 # function to examine log file for reboots
-# Substantially similar to above
+# Substantially similar to above.  The app gets its restarts from the
+# "REBOOTS" entry of parse_sections instead, this is kept for scripts.
 def rebootID(filename):
     # Check for file to exist
     if not os.path.exists(filename):
@@ -200,13 +842,14 @@ def rebootID(filename):
 
     # Container to hold the return values
     retvals = []
+    times = []
+    meridiems = []
 
     with open(filename, "r") as _file:
         header = _file.readline()
         header = header.split()
         startdate = parse_date(header[3])
 
-        pm = False
         for line in _file:
             if line == "\n" or "Average" in line or "Summary" in line:
                 continue
@@ -214,23 +857,171 @@ def rebootID(filename):
             vals = line.split()
 
             if vals[3] == "RESTART":
-                if vals[1] == "PM":
-                    if not pm:
-                        pm = True
-                elif vals[1] == "AM" and pm:
-                    startdate = startdate + timedelta(days=1)
-                    pm = False
-
-                return_candidate = [format_time(startdate, vals[0], vals[1])] + vals[2:]
-                retvals.append(return_candidate)
+                times.append(vals[0])
+                meridiems.append(vals[1])
+                retvals.append(vals[2:])
             else:
                 continue
 
-        return_var = retvals
+    datetimes = build_datetimes(startdate, times, meridiems)
+    return_var = [
+        [stamp] + row for stamp, row in zip(pd.DatetimeIndex(datetimes), retvals)
+    ]
 
     return return_var
 
 
+#############################################################################
+# sadf output and binary sa files
+#############################################################################
+# sadf -d writes every report as semicolon separated rows, one header line
+# per report:
+#   # hostname;interval;timestamp;CPU;%usr;%nice;...
+#   myhost;600;2021-03-01 00:10:01 UTC;-1;1.00;0.00;...
+# Everything after the timestamp lines up with the text headers above, so
+# the same lookup finds the section.  Rows come back with full timestamps,
+# no rollover tracking needed, and each section goes through the C csv
+# reader in one go.
+#
+# Binary sa files are run through sadf first.  Use "sadf -d -t" when
+# converting files by hand so times match what sar prints (local time).
+
+
+# Read any supported log and return its sections, like parse_sections
+# Plain sar text, sadf -d output and binary sa files are all accepted.
+def read_sections(filename, sections=None, filters=None):
+    # Check for file to exist
+    if not os.path.exists(filename):
+        print("File not found")
+        return
+
+    log_format = sniff_format(filename)
+    if log_format == "sadf":
+        with open(filename, "r") as _file:
+            return parse_sadf(_file, sections, filters)
+    if log_format == "binary":
+        return parse_sadf(run_sadf(filename), sections, filters)
+
+    return parse_sections(filename, sections, filters=filters)
+
+
+# Work out what kind of log we've been handed: "sar", "sadf" or "binary"
+def sniff_format(filename):
+    with open(filename, "rb") as _file:
+        start = _file.read(1024)
+
+    if b"\x00" in start:
+        return "binary"
+    if start.startswith(b"# hostname;"):
+        return "sadf"
+
+    return "sar"
+
+
+# Convert a binary sa file with the local sadf, returning the output lines
+def run_sadf(filename):
+    sadf = shutil.which("sadf")
+    if sadf is None:
+        raise Exception("sadf is needed to read binary sa file: %s" % filename)
+
+    result = subprocess.run(
+        [sadf, "-d", "-t", filename, "--", "-A"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return io.StringIO(result.stdout)
+
+
+# Parse sadf -d output into sections plus restarts
+# Returns a dictionary of section name to dataframe, like parse_sections
+def parse_sadf(lines, sections=None, filters=None):
+    if sections is None:
+        sections = list(section_headers)
+    if filters is None:
+        filters = section_filters
+
+    # Gather the raw rows of each section, the csv reader does the rest
+    # Each section keeps the columns of the first header version seen.
+    blocks = {section: [] for section in sections}
+    columns = {}
+    restarts = []
+
+    current = None
+    for line in lines:
+        if line.startswith("#"):
+            names = line[1:].strip().split(";")
+            current = header_lookup.get(tuple(names[3:]))
+            if current not in blocks:
+                current = None
+            elif columns.setdefault(current, names[3:]) != names[3:]:
+                current = None
+            continue
+
+        if "LINUX-RESTART" in line:
+            fields = line.split(";")
+            restarts.append([fields[2][:19], "LINUX", "RESTART"])
+            continue
+
+        if current is not None:
+            blocks[current].append(line)
+
+    return_var = {}
+    for section in sections:
+        return_var[section] = convert_sadf_block(
+            section, blocks[section], columns.get(section), filters.get(section)
+        )
+
+    found = pd.DataFrame(restarts, columns=restart_columns)
+    found["datetime"] = pd.to_datetime(found["datetime"], format="%Y-%m-%d %H:%M:%S")
+    return_var["REBOOTS"] = combine_restarts([found])
+
+    return return_var
+
+
+# Turn the rows for one section of sadf output into a dataframe
+# names are the columns from the header sadf printed, if one was seen
+# filter_tag is the identifiers to keep, None for every row
+def convert_sadf_block(section, rows, names=None, filter_tag=None):
+    if names is None:
+        names = section_headers[section].split()[2:]
+    columns = ["datetime"] + list(names)
+    keyed = columns[1] in key_columns
+    value_columns = columns[2:] if keyed else columns[1:]
+    names = ["hostname", "interval", "timestamp"] + columns[1:]
+    dtypes = {name: section_registry[section]["dtype"] for name in value_columns}
+    if keyed:
+        dtypes[columns[1]] = str
+
+    df = pd.read_csv(
+        io.StringIO("".join(rows)),
+        sep=";",
+        header=None,
+        names=names,
+        dtype=dtypes,
+        usecols=["timestamp"] + columns[1:],
+    )
+
+    keys = None
+    if keyed:
+        keys = df[columns[1]]
+        # sadf reports the CPU aggregate as -1 where sar says "all"
+        if columns[1] == "CPU":
+            keys = keys.replace("-1", "all")
+        if filter_tag is not None:
+            df = df.loc[keys.isin(filter_tag).to_numpy()]
+            keys = keys.loc[df.index]
+        keys = keys.tolist()
+
+    datetimes = pd.to_datetime(
+        df["timestamp"].str.slice(0, 19), format="%Y-%m-%d %H:%M:%S"
+    ).to_numpy()
+    values = df[value_columns].to_numpy(dtype=section_registry[section]["dtype"])
+
+    df = convert_to_dataframe(columns, datetimes, keys, values)
+    return add_derived(section, df)
+
+
 #############################################################################
 # Backstop
 #############################################################################
@@ -0,0 +1,40 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The app modules sit at the top of the repo rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# When the sample log was written, a day well in the past
+log_time = 1614729600
+
+
+# Two systems logging the sample day, laid out the way configs expects
+# (base_path/SYSTEM_NAME/sar) under a scratch directory with its own cache
+# and store.  Hands back the file_locations for them.
+@pytest.fixture
+def file_list(tmp_path, monkeypatch):
+    import configs
+    import utility_functions as uf
+
+    monkeypatch.chdir(tmp_path)
+    bases = ["./logs/system1/sar", "./logs/system2/sar"]
+    for base in bases:
+        os.makedirs(os.path.dirname(base))
+        shutil.copy(os.path.join(data_dir, "sar01"), base + "01")
+        os.utime(base + "01", (log_time, log_time))
+
+    monkeypatch.setattr(configs, "cache_dir", "./cache")
+    monkeypatch.setattr(configs, "figure_cache_dir", "./cache/figures")
+    monkeypatch.setattr(configs, "store_path", None)
+    monkeypatch.setattr(configs, "parse_workers", 1)
+    uf.get_frame_cache().clear()
+    uf._follow_states.clear()
+
+    yield bases
+
+    uf.get_frame_cache().clear()
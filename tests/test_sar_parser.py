@@ -0,0 +1,110 @@
+import os
+
+import pandas as pd
+import pytest
+
+import sar_parser as sp
+
+data_dir = os.path.join(os.path.dirname(__file__), "data")
+
+# A day with a restart in the afternoon.  The INTR block isn't in the
+# section registry, and the restart after it must not be timed from the
+# TASK block before it, which would push it into the next day.
+restart_log = """Linux 3.10.0-1160.el7.x86_64 (system1) \t03/01/2021 \t_x86_64_\t(4 CPU)
+
+12:00:01 AM    proc/s   cswch/s
+12:10:01 AM      1.00      2.00
+11:50:01 PM      3.00      4.00
+Average:         2.00      3.00
+
+12:00:01 AM      INTR    intr/s
+12:10:01 AM       sum      5.00
+11:50:01 PM       sum      6.00
+Average:          sum      5.50
+
+01:53:20 PM       LINUX RESTART\t(4 CPU)
+
+12:00:01 AM  pswpin/s pswpout/s
+12:10:01 AM      0.00      0.00
+01:50:01 PM      0.00      0.00
+
+01:53:20 PM       LINUX RESTART\t(4 CPU)
+
+02:00:01 PM  pswpin/s pswpout/s
+02:10:01 PM      1.00      1.00
+Average:         0.50      0.50
+"""
+
+
+def write_log(tmp_path, text):
+    filename = tmp_path / "sar01"
+    filename.write_text(text)
+    return str(filename)
+
+
+def test_restart_after_unknown_block(tmp_path):
+    filename = write_log(tmp_path, restart_log)
+    index = sp.build_index(filename)
+    assert [i[0] for i in index["restarts"]] == ["SWAP_STATS"]
+
+    frames = sp.parse_sections(filename)
+    assert frames["REBOOTS"]["datetime"].tolist() == [
+        pd.Timestamp("2021-03-01 13:53:20")
+    ]
+    assert len(frames["TASK"]) == 2
+    assert len(frames["SWAP_STATS"]) == 3
+
+
+def test_follow_matches_indexed_read(tmp_path):
+    filename = write_log(tmp_path, restart_log)
+    frames = sp.parse_sections(filename)
+    followed, _ = sp.follow_sections(filename)
+
+    for section in ("TASK", "SWAP_STATS", "REBOOTS"):
+        pd.testing.assert_frame_equal(
+            followed[section], frames[section], check_dtype=False
+        )
+
+
+# sadf01 is the sadf -d output for the same data as the sar text in sar01
+@pytest.mark.parametrize("filters", [None, {}])
+def test_sadf_matches_text(filters):
+    text_log = os.path.join(data_dir, "sar01")
+    sadf_log = os.path.join(data_dir, "sadf01")
+    assert sp.sniff_format(text_log) == "sar"
+    assert sp.sniff_format(sadf_log) == "sadf"
+
+    sections = ["CPU", "TASK", "LOAD"]
+    frames = sp.parse_sections(text_log, sections, filters=filters)
+    with open(sadf_log, "r") as _file:
+        converted = sp.parse_sadf(_file, sections, filters=filters)
+
+    for section in sections + ["REBOOTS"]:
+        pd.testing.assert_frame_equal(converted[section], frames[section])
+
+
+# sar -r ALL on sysstat 11.5 and later adds columns to the memory report
+mem_all_log = """Linux 4.18.0-305.el8.x86_64 (system1) \t03/01/2021 \t_x86_64_\t(2 CPU)
+
+12:00:01 AM kbmemfree   kbavail kbmemused  %memused kbbuffers  kbcached  kbcommit   %commit  kbactive   kbinact   kbdirty  kbanonpg    kbslab  kbkstack   kbpgtbl  kbvmused
+12:10:01 AM   1024000   2048000   3072000     75.00     10240    512000   4096000     50.00   2000000    800000       128   1500000    200000      9000     12000     30000
+12:20:01 AM   1020000   2040000   3076000     75.10     10240    512400   4100000     50.05   2001000    801000       256   1501000    200100      9010     12010     30010
+Average:      1022000   2044000   3074000     75.05     10240    512200   4098000     50.03   2000500    800500       192   1500500    200050      9005     12005     30005
+"""
+
+
+def test_mem_use_all_columns(tmp_path):
+    filename = write_log(tmp_path, mem_all_log)
+    frames = sp.parse_sections(filename, ["MEM_USE"])
+    followed, _ = sp.follow_sections(filename)
+
+    df = frames["MEM_USE"]
+    assert list(df.columns[-5:]) == [
+        "kbanonpg",
+        "kbslab",
+        "kbkstack",
+        "kbpgtbl",
+        "kbvmused",
+    ]
+    assert df["kbslab"].tolist() == [200000, 200100]
+    pd.testing.assert_frame_equal(followed["MEM_USE"], df)
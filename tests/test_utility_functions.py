@@ -0,0 +1,125 @@
+import os
+
+import configs
+import pandas as pd
+
+import conftest
+import utility_functions as uf
+
+
+def test_store_matches_logs(file_list):
+    logs = uf.get_section_range(file_list, "2021-03-01", "2021-03-01", "CPU")
+    reboots = uf.get_reboots_range(file_list, "2021-03-01", "2021-03-01")
+
+    configs.store_path = "./store/sar.db"
+    assert sorted(uf.ingest_logs(file_list)) == sorted(i + "01" for i in file_list)
+    assert uf.ingest_logs(file_list) == []
+
+    stored = uf.query_section("CPU", "2021-03-01", "2021-03-01")
+    pd.testing.assert_frame_equal(stored, logs, check_dtype=False)
+
+    uf.get_frame_cache().clear()
+    ranged = uf.get_section_range(file_list, "2021-03-01", "2021-03-01", "CPU")
+    pd.testing.assert_frame_equal(ranged, logs, check_dtype=False)
+    pd.testing.assert_frame_equal(
+        uf.get_reboots_range(file_list, "2021-03-01", "2021-03-01"),
+        reboots,
+        check_dtype=False,
+    )
+
+
+def test_store_empty_range(file_list):
+    configs.store_path = "./store/sar.db"
+    uf.ingest_logs(file_list)
+
+    assert uf.get_section_range(file_list, "2021-03-02", "2021-03-01", "CPU").empty
+    assert uf.query_section("CPU", "2021-03-02", "2021-03-01").empty
+
+
+def test_pick_rollup():
+    day = 24 * 3600
+    assert uf.pick_rollup(day, 2000) is None
+    assert uf.pick_rollup(day, 1000) == "1m"
+    assert uf.pick_rollup(7 * day, 2000) == "5m"
+    assert uf.pick_rollup(30 * day, 500) == "1h"
+
+
+def test_rollups_keep_extremes(file_list):
+    logs = uf.get_section_range(file_list, "2021-03-01", "2021-03-01", "CPU")
+    configs.store_path = "./store/sar.db"
+    uf.ingest_logs(file_list)
+
+    hourly = logs.groupby(
+        ["system", pd.Grouper(key="datetime", freq="1h")], observed=True
+    )
+    for stat in ["min", "max"]:
+        stored = uf.query_section(
+            "CPU", "2021-03-01", "2021-03-01", rollup="1h", stat=stat
+        )
+        expected = getattr(hourly["%usr"], stat)().dropna()
+        assert stored["%usr"].tolist() == expected.tolist()
+
+
+def test_downsample_keeps_extremes():
+    df = pd.DataFrame(
+        {
+            "datetime": pd.date_range("2021-03-01", periods=6, freq="10min"),
+            "%usr": [1.0, 9.0, 5.0, 2.0, 8.0, 0.5],
+            "system": "system1",
+        }
+    )
+    small = uf.downsample(df, "30min")
+    assert small["%usr"].tolist() == [1.0, 9.0, 0.5, 8.0]
+    assert small["datetime"].dt.minute.tolist() == [0, 0, 30, 30]
+
+
+def test_load_job_completes(file_list):
+    logs = uf.generate_file_list(file_list, "01")
+    sections = ["CPU", "REBOOTS"]
+    assert not uf.logs_ready(logs, sections)
+
+    jobs = uf.LoadJobs(1)
+    job_id = jobs.submit(logs, sections)
+    assert jobs.submit(logs, sections) == job_id
+    jobs.executor.shutdown(wait=True)
+
+    progress = jobs.progress(job_id)
+    assert progress["done"]
+    assert progress["error"] is None
+    assert progress["hosts"] == [("system1", "done"), ("system2", "done")]
+    assert uf.logs_ready(logs, sections)
+    assert jobs.submit(logs, sections) is None
+
+
+def test_figure_cache(file_list, monkeypatch):
+    import layout_configs as lc
+
+    logs = uf.generate_file_list(file_list, "01")
+    key = ["comp-cpu-usr", "01", None]
+    fig = {"data": [{"y": [1.5, 2.5]}], "layout": {"title": {"text": "CPU"}}}
+    assert uf.read_figure(key, logs) is None
+
+    uf.write_figure(key, logs, fig)
+    assert uf.read_figure(key, logs) == fig
+
+    # Settings that change how a figure comes out pick another one
+    with monkeypatch.context() as patch:
+        patch.setattr(lc, "max_trace_points", 10)
+        assert uf.read_figure(key, logs) is None
+    assert uf.read_figure(key, logs) == fig
+
+    # So does a change to one of the logs it was drawn from
+    os.utime(logs[0], (conftest.log_time + 60, conftest.log_time + 60))
+    assert uf.read_figure(key, logs) is None
+
+
+def test_figure_cache_pruned(file_list, monkeypatch):
+    logs = uf.generate_file_list(file_list, "01")
+    fig = {"data": [{"y": list(range(1000))}], "layout": {}}
+    monkeypatch.setattr(configs, "figure_cache_mb", 0.005)
+    for graph in ["comp-cpu-usr", "comp-cpu-sys", "comp-cpu-iowait"]:
+        monkeypatch.setattr(uf, "_figures_pruned", 0.0)
+        uf.write_figure([graph, "01", None], logs, fig)
+
+    assert len(os.listdir(configs.figure_cache_dir)) == 1
+    assert uf.read_figure(["comp-cpu-iowait", "01", None], logs) == fig
@@ -4,10 +4,51 @@
 
     It's an organizational thing...
 """
+import fcntl
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import math
 import pandas as pd
+from plotly.io.json import to_json_plotly
 import sar_parser as sp
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Bump this when the parser output changes so old cache entries get rebuilt
+CACHE_VERSION = 5
+
+
+# Look up a setting from configs.py
+# configs imports this module, so the lookup has to wait until call time
+def _config(name, default=None):
+    import configs as conf
+
+    return getattr(conf, name, default)
+
+
 # Function to set the right datatypes in a dataframe
+# Frames straight from the parser are already typed, so this is mostly a
+# pass-through now.  Only text columns get converted.
 def set_types(df):
     column_names = df.columns.values.tolist()
     # Loop through the columns to set the correct types
@@ -25,6 +66,9 @@ def set_types(df):
             ):
                 count += 1
                 continue
+            if pd.api.types.is_numeric_dtype(df[df.columns[count]]):
+                count += 1
+                continue
             df[df.columns[count]] = df[df.columns[count]].apply(pd.to_numeric)
         count += 1
 
@@ -51,6 +95,773 @@ def create_system_list(file_list):
     return listing
 
 
+#############################################################################
+# Parsed data cache
+#############################################################################
+# Parsed sections are kept on disk, one pickle per section per log file,
+# under configs.cache_dir.  Each log gets its own directory holding a small
+# meta file with the path, mtime and size of the log when it was parsed,
+# and for sar text logs the section index (index.json).
+# If any of those change (sar appending to today's file) the directory is
+# cleared and the log is parsed again.  Past days never change, so after
+# the first visit they only cost a pickle read.
+
+
+# Where the cache directory for a log file goes, None if caching is off
+def _entry_path(filename):
+    cache_dir = _config("cache_dir")
+    if not cache_dir:
+        return None
+
+    path = os.path.abspath(filename)
+    digest = hashlib.sha1(path.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, os.path.basename(path) + "_" + digest)
+
+
+# Find the cache directory for a log file, clearing it out if it's stale
+# Returns None if caching is turned off.  Only call it holding the log's
+# file lock, the directory may be emptied.
+# grown is for a followed log, whose cached sections are brought up to date
+# one by one: the entry is only cleared if something other than the log's
+# mtime and size has changed.
+def _cache_entry(filename, grown=False):
+    entry = _entry_path(filename)
+    if entry is None:
+        return None
+
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    meta = {
+        "path": path,
+        "mtime": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "version": CACHE_VERSION,
+        "full_fidelity": bool(_config("full_fidelity", False)),
+    }
+
+    meta_file = os.path.join(entry, "meta.json")
+    try:
+        with open(meta_file, "r") as _file:
+            current = json.load(_file)
+    except (OSError, ValueError):
+        current = None
+
+    if current != meta:
+        same_log = current is not None and all(
+            current.get(i) == meta[i] for i in meta if i not in ("mtime", "size")
+        )
+        if not (grown and same_log):
+            shutil.rmtree(entry, ignore_errors=True)
+            os.makedirs(entry, exist_ok=True)
+        _atomic_write(meta_file, lambda tmp: _write_json(tmp, meta))
+
+    return entry
+
+
+def _write_json(filename, data):
+    with open(filename, "w") as _file:
+        json.dump(data, _file)
+
+
+# Write through a temp file so readers never see a half written entry
+def _atomic_write(filename, writer):
+    tmp = "%s.%d.tmp" % (filename, os.getpid())
+    writer(tmp)
+    os.replace(tmp, filename)
+
+
+# Read cached frames for the given names, None if any are missing
+def _read_cached(entry, names):
+    frames = {}
+    for name in names:
+        try:
+            frames[name] = pd.read_pickle(os.path.join(entry, name + ".pkl"))
+        except (OSError, EOFError, ValueError):
+            return None
+
+    return frames
+
+
+def _write_cached(entry, name, df):
+    filename = os.path.join(entry, name + ".pkl")
+    _atomic_write(filename, df.to_pickle)
+
+
+# One lock per log file so callbacks missing the cache at the same time
+# wait for a single parse rather than each starting their own.  The pool's
+# workers fill cache entries from other processes, so the lock is also
+# taken on a lock file next to the log's cache entry.
+_file_locks = {}
+_file_locks_guard = threading.Lock()
+
+
+class FileLock:
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.handle = None
+
+    # Same as threading.Lock.acquire, without the timeout
+    def acquire(self, blocking=True):
+        if not self.lock.acquire(blocking):
+            return False
+
+        entry = _entry_path(self.filename)
+        if entry is None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            handle = open(entry + ".lock", "a")
+        except OSError:
+            self.lock.release()
+            raise
+
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            handle.close()
+            self.lock.release()
+            return False
+
+        self.handle = handle
+        return True
+
+    def release(self):
+        # Closing the file lets go of the lock on it
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        self.lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def _file_lock(filename):
+    path = os.path.abspath(filename)
+    with _file_locks_guard:
+        if path not in _file_locks:
+            _file_locks[path] = FileLock(path)
+        return _file_locks[path]
+
+
+# Parse a log into sections, going through the cache when possible
+# Finished sar text logs are indexed on the first miss (the index is kept
+# in the cache entry) and after that only the blocks of the sections that
+# are missing get read.  Live logs and sadf/binary logs are parsed whole
+# and every section is stored, since the file is being read anyway.
+# The frames handed back may be shared, so add columns with assign().
+def load_sections(filename, sections):
+    # Check for file to exist
+    if not os.path.exists(filename):
+        print("File not found")
+        return
+
+    with _file_lock(filename):
+        if _is_live(filename) and sp.sniff_format(filename) == "sar":
+            return _load_live(filename, sections)
+
+        entry = _cache_entry(filename)
+        if entry is None:
+            data = _parse_log(filename)
+            return {section: data[section] for section in sections}
+
+        data = {}
+        for section in sections:
+            data.update(_read_cached(entry, [section]) or {})
+        missing = [section for section in sections if section not in data]
+        if not missing:
+            return data
+
+        if sp.sniff_format(filename) != "sar":
+            parsed = _parse_log(filename)
+        else:
+            index = _load_index(entry, filename)
+            parsed = sp.parse_sections(
+                filename,
+                sp.index_sections(index, missing),
+                index=index,
+                filters=_filters(),
+            )
+            # The restarts only come from the sections just read, which
+            # won't have them all unless they were read for the restarts
+            if "REBOOTS" not in missing:
+                del parsed["REBOOTS"]
+        for section, df in parsed.items():
+            _write_cached(entry, section, df)
+        data.update(parsed)
+
+    return {section: data[section] for section in sections}
+
+
+# Sections of a log sar is still writing, which is followed on every load
+# so only the rows added since the last one get parsed.  Just the sections
+# that got new rows are written back to the cache.  The cache is read when
+# the log isn't being followed yet and hasn't changed since it was stored.
+def _load_live(filename, sections):
+    state = _follow_states.get(os.path.abspath(filename))
+    if state is None:
+        entry = _cache_entry(filename)
+        cached = None if entry is None else _read_cached(entry, sections)
+        if cached is not None:
+            return cached
+        previous = {}
+    else:
+        # Recorded before reading on, so the cache never claims rows it lacks
+        entry = _cache_entry(filename, grown=True)
+        previous = state["frames"]
+
+    data = _parse_log(filename)
+    if entry is not None:
+        for section, df in data.items():
+            if df is not previous.get(section):
+                _write_cached(entry, section, df)
+
+    return {section: data[section] for section in sections}
+
+
+# The section index of a log, built on first use and kept with its cache
+def _load_index(entry, filename):
+    index_file = os.path.join(entry, "index.json")
+    try:
+        with open(index_file, "r") as _file:
+            return json.load(_file)
+    except (OSError, ValueError):
+        pass
+
+    index = sp.build_index(filename)
+    _atomic_write(index_file, lambda tmp: _write_json(tmp, index))
+    return index
+
+
+# Today's logs are followed: the parser state is kept between reads so
+# only the rows sar has added since the last read get parsed.
+# Keyed by absolute path, an entry is only used while holding its file lock.
+_follow_states = {}
+
+
+# Parse every section of a log, following it if it's still being written
+def _parse_log(filename):
+    path = os.path.abspath(filename)
+    for followed in list(_follow_states):
+        if not _is_live(followed):
+            _follow_states.pop(followed, None)
+
+    if not _is_live(path) or sp.sniff_format(path) != "sar":
+        return sp.read_sections(path, filters=_filters())
+
+    data, _follow_states[path] = sp.follow_sections(
+        path, _follow_states.get(path), _filters()
+    )
+    return data
+
+
+# Rows the parser keeps: everything in full fidelity mode, otherwise the
+# parser's own filters (aggregate CPU row, eth0 and lo)
+def _filters():
+    if _config("full_fidelity", False):
+        return {}
+
+    return None
+
+
+# A log that's been written to recently is assumed to still be growing
+def _is_live(filename):
+    try:
+        age = time.time() - os.path.getmtime(filename)
+    except OSError:
+        return False
+
+    return age < _config("live_window", 3600)
+
+
+# Day of the month, as used in the log file names, for today
+def today():
+    return datetime.now().strftime("%d")
+
+
+# Restarts found in a log, going through the cache when possible
+# They're collected by the same pass that reads the sections.
+def load_reboots(filename):
+    data = load_sections(filename, ["REBOOTS"])
+    if data is None:
+        return
+
+    return data["REBOOTS"]
+
+
+#############################################################################
+# In-memory frame cache
+#############################################################################
+# The callbacks on a page all ask for the same handful of frames, so the
+# combined (all systems) frames are kept in memory between callbacks.
+# Keys include the mtime and size of every log involved, so a log that
+# changes simply stops matching and its old entries age out.
+class FrameCache:
+    def __init__(self, max_mb):
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+        self._bytes = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    # Return the cached frame for key, calling loader to build it if needed.
+    # Only one caller runs the loader for a key, anyone else asking for the
+    # same key in the meantime waits for that result.
+    def get(self, key, loader):
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return self._frames[key][0]
+
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.hits += 1
+                owner = False
+            else:
+                self.misses += 1
+                pending = self._pending[key] = Future()
+                owner = True
+
+        if not owner:
+            return pending.result()
+
+        try:
+            df = loader()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._pending[key]
+            self._store(key, df)
+        pending.set_result(df)
+
+        return df
+
+    # Add a frame and push out the least recently used ones to stay in budget
+    # Frames bigger than the whole budget are handed back but not kept
+    def _store(self, key, df):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        self._frames[key] = (df, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, old_size) = self._frames.popitem(last=False)
+            self._bytes -= old_size
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._frames),
+                "mb": self._bytes / (1024 * 1024),
+                "max_mb": self.max_bytes / (1024 * 1024),
+            }
+
+
+_frame_cache = None
+_frame_cache_guard = threading.Lock()
+
+
+# The shared cache, sized from configs.frame_cache_mb on first use
+def get_frame_cache():
+    global _frame_cache
+    with _frame_cache_guard:
+        if _frame_cache is None:
+            _frame_cache = FrameCache(_config("frame_cache_mb", 512))
+
+    return _frame_cache
+
+
+# Identify the current state of a set of logs for use in cache keys
+def _file_states(logs):
+    states = []
+    for i in logs:
+        try:
+            stat = os.stat(i)
+            states.append((i, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            states.append((i, None, None))
+
+    return tuple(states)
+
+
+#############################################################################
+# Figure cache
+#############################################################################
+# A past day's charts never change either, so once drawn a figure is kept
+# on disk as JSON under configs.figure_cache_dir, one file per chart, day
+# and selection.  The first line of a file records the mtime and size
+# of the day's logs when it was drawn; if any of them has changed since, the
+# file is dropped and the chart drawn again.  Live logs are never cached.
+# A hit skips the parse and the chart, the JSON is only decoded to be handed
+# back to Dash.  orjson is used when it's installed, and the files can be
+# gzipped (configs.figure_cache_gzip) to save space.
+# The files used longest ago are dropped to keep the directory under
+# configs.figure_cache_mb.
+
+# Bump this when the charts change so old figures get drawn again
+FIGURE_VERSION = 4
+
+# Interface settings (layout_configs) that change how a figure comes out,
+# part of every figure's key
+figure_settings = [
+    "max_trace_points",
+    "webgl_points",
+    "compact_figures",
+    "value_decimals",
+    "default_decimals",
+]
+
+
+def _figure_file(key):
+    import layout_configs as lc
+
+    figure_dir = _config("figure_cache_dir")
+    if not figure_dir:
+        return None
+
+    settings = {i: getattr(lc, i, None) for i in figure_settings}
+    digest = hashlib.sha1(
+        json.dumps([key, settings], sort_keys=True).encode()
+    ).hexdigest()
+    suffix = ".json.gz" if _config("figure_cache_gzip", False) else ".json"
+    return os.path.join(figure_dir, digest + suffix)
+
+
+def _figure_meta(logs):
+    return {
+        "version": FIGURE_VERSION,
+        "full_fidelity": bool(_config("full_fidelity", False)),
+        "logs": [list(i) for i in _file_states(logs)],
+    }
+
+
+def _open_figure(filename, mode):
+    if filename.endswith(".gz"):
+        return gzip.open(filename, mode)
+
+    return open(filename, mode)
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+# The cached figure (as a dict) for a chart drawn from these logs, None if
+# there isn't one or it's out of date
+def read_figure(key, logs):
+    filename = _figure_file(key)
+    if filename is None or any(_is_live(i) for i in logs):
+        return None
+
+    try:
+        with _open_figure(filename, "rb") as _file:
+            if _json_loads(_file.readline()) != _figure_meta(logs):
+                os.remove(filename)
+                return None
+            fig = _json_loads(_file.read())
+        os.utime(filename)
+        return fig
+    except (OSError, EOFError, ValueError):
+        return None
+
+
+# Keep a figure (or anything else plotly can encode) drawn from these logs
+# for next time
+def write_figure(key, logs, fig):
+    filename = _figure_file(key)
+    if filename is None or any(_is_live(i) for i in logs):
+        return
+
+    meta = json.dumps(_figure_meta(logs))
+    data = (meta + "\n" + to_json_plotly(fig)).encode()
+    if filename.endswith(".gz"):
+        data = gzip.compress(data, compresslevel=5)
+
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    _atomic_write(filename, lambda tmp: pathlib.Path(tmp).write_bytes(data))
+    _prune_figures(os.path.dirname(filename))
+
+
+# When the figure cache was last pruned
+_figures_pruned = 0.0
+
+
+# Drop the figures used longest ago (a hit touches the file) until the cache
+# fits in configs.figure_cache_mb.  Runs at most once a minute.
+def _prune_figures(figure_dir):
+    global _figures_pruned
+    limit = _config("figure_cache_mb")
+    now = time.time()
+    if not limit or now - _figures_pruned < 60:
+        return
+    _figures_pruned = now
+
+    files = []
+    for entry in os.scandir(figure_dir):
+        if entry.name.endswith(".tmp"):
+            continue
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(i[1] for i in files)
+    for _, size, path in sorted(files):
+        if total <= limit * 1024 * 1024:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+
+#############################################################################
+# Parallel loading
+#############################################################################
+# Parsing is pure Python, so threads don't help - the logs for each system
+# are spread over a pool of processes instead (configs.parse_workers).
+# The server runs callbacks on threads, so the workers are started from a
+# fork server rather than forked from the server with other threads' locks
+# held.
+_pool = None
+_pool_guard = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_guard:
+        if _pool is None:
+            workers = _config("parse_workers") or os.cpu_count()
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+
+    return _pool
+
+
+# A pool that lost a worker (killed, out of memory...) takes no more work,
+# let it go so the next _get_pool starts a new one
+def _drop_pool(pool):
+    global _pool
+    if pool is None:
+        return
+
+    with _pool_guard:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Run func(log, *args) for every log, in the pool when it's worth it
+# Results come back in the same order as the logs
+# Live logs always stay in this process, which is where their follow
+# state is kept.  If the pool breaks, the logs get one more go in a new one.
+def _map_logs(func, logs, *args):
+    workers = _config("parse_workers") or os.cpu_count()
+    if workers <= 1 or len(logs) <= 1:
+        return [func(i, *args) for i in logs]
+
+    pooled = [i for i in logs if not _is_live(i)]
+    arg_lists = [[arg] * len(pooled) for arg in args]
+    pool = _get_pool()
+    try:
+        results = list(pool.map(func, pooled, *arg_lists))
+    except BrokenProcessPool:
+        _drop_pool(pool)
+        pool = _get_pool()
+        try:
+            results = list(pool.map(func, pooled, *arg_lists))
+        except BrokenProcessPool:
+            _drop_pool(pool)
+            raise
+
+    inline = {i: func(i, *args) for i in logs if i not in pooled}
+    results = dict(zip(pooled, results))
+    results.update(inline)
+
+    return [results[i] for i in logs]
+
+
+#############################################################################
+# Background loading
+#############################################################################
+# A big day on many systems takes longer to parse than a browser waits for
+# an answer.  Instead of parsing in the request, the interface starts a load
+# job for the day: the logs are parsed in the pool (filling the disk cache)
+# while the browser polls the job's progress, one entry per system, and the
+# charts are drawn from the cache once it's done.  Jobs asking for the same
+# logs share one run, and only configs.load_jobs run at a time so a rush of
+# users queues up rather than swamping the machine.
+# Live logs are parsed in this process, where their follow state is kept.
+class LoadJobs:
+    def __init__(self, workers, keep=100):
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.keep = keep
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+
+    # Start loading the sections of the logs, handing back the job id
+    # None if there's nothing to do
+    def submit(self, logs, sections):
+        if logs_ready(logs, sections):
+            return None
+
+        job_id = hashlib.sha1(
+            repr((_file_states(logs), sorted(sections))).encode()
+        ).hexdigest()[:16]
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job["error"] is None:
+                self.jobs.move_to_end(job_id)
+                return job_id
+
+            job = {
+                "logs": list(logs),
+                "states": {i: "waiting" for i in logs},
+                "error": None,
+                "done": False,
+            }
+            self.jobs[job_id] = job
+            while len(self.jobs) > self.keep:
+                self.jobs.popitem(last=False)
+
+        self.executor.submit(self._run, job, sections)
+        return job_id
+
+    # Whatever goes wrong, the job ends up done so the browser stops polling
+    def _run(self, job, sections):
+        pool = None
+        futures = {}
+        try:
+            pooled = [i for i in job["logs"] if not _is_live(i)]
+            workers = _config("parse_workers") or os.cpu_count()
+            if workers <= 1:
+                pooled = []
+
+            if pooled:
+                pool = _get_pool()
+            for log in pooled:
+                futures[pool.submit(_prepare_log, log, sections)] = log
+                job["states"][log] = "parsing"
+
+            for log in job["logs"]:
+                if log not in pooled:
+                    job["states"][log] = "parsing"
+                    self._finish(job, log, lambda: _prepare_log(log, sections))
+
+            for future in as_completed(futures):
+                self._finish(job, futures[future], future.result)
+        except Exception as error:
+            for log, state in job["states"].items():
+                if state != "done":
+                    job["states"][log] = "failed"
+            job["error"] = repr(error)
+            if isinstance(error, BrokenProcessPool):
+                _drop_pool(pool)
+        finally:
+            # The logs of a broken pool fail, the next job gets a new pool
+            for future in futures:
+                if future.cancelled() or not future.done():
+                    continue
+                if isinstance(future.exception(), BrokenProcessPool):
+                    _drop_pool(pool)
+                    break
+            job["done"] = True
+
+    def _finish(self, job, log, result):
+        try:
+            result()
+            job["states"][log] = "done"
+        except Exception as error:
+            job["states"][log] = "failed"
+            job["error"] = repr(error)
+
+    # Where a job is up to: [(system, state)] for its logs and whether it's
+    # done.  None for a job that's unknown (or long gone).
+    def progress(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return None
+
+        hosts = [(i.split("/", -1)[2], job["states"][i]) for i in job["logs"]]
+        return {"hosts": hosts, "done": job["done"], "error": job["error"]}
+
+
+_load_jobs = None
+_load_jobs_guard = threading.Lock()
+
+
+# The shared job queue, sized from configs.load_jobs on first use
+def get_load_jobs():
+    global _load_jobs
+    with _load_jobs_guard:
+        if _load_jobs is None:
+            _load_jobs = LoadJobs(_config("load_jobs", 2) or 1)
+
+    return _load_jobs
+
+
+# Parse a log's sections into the disk cache - run by the load jobs
+def _prepare_log(log, sections):
+    if load_sections(log, sections) is None:
+        raise FileNotFoundError(log)
+
+
+# Can the sections of these logs be read without parsing anything?
+# True when they're in the disk cache (or caching is off, when there's
+# nothing for a job to fill), or the log is live and already being followed.
+def logs_ready(logs, sections):
+    for log in logs:
+        if not os.path.exists(log):
+            continue
+        if os.path.abspath(log) in _follow_states:
+            continue
+
+        # A log that's locked is being parsed (maybe by a pool worker), so
+        # it isn't ready yet
+        lock = _file_lock(log)
+        if not lock.acquire(blocking=False):
+            return False
+        try:
+            entry = _cache_entry(log)
+            if entry is None:
+                return True
+            names = [os.path.join(entry, i + ".pkl") for i in sections]
+            if not all(os.path.exists(i) for i in names):
+                return False
+        finally:
+            lock.release()
+
+    return True
+
+
 # Create complete section-specific dataframes
 # This is the main list of sections we can extract
 # The actual list is dependent on how the system is configured for logging.
@@ -60,57 +871,629 @@ def create_system_list(file_list):
 
 
 def get_section_all_files(file_list, date, section):
-    system_list = []
-    df = pd.DataFrame()
-
     logs = generate_file_list(file_list, date)
-    for i in logs:
-        path_list = i.split("/", -1)
-        system_name = path_list[2]
-        system_list.append(system_name)
+    key = ("section", section, _file_states(logs))
+    df = get_frame_cache().get(key, lambda: _section_all_files(logs, section))
 
-        data = sp.parsefile(i, section)
-        data["system"] = system_name
-        df = pd.concat([df, data])
-        df.reset_index(drop=True, inplace=True)
+    # Hand out a copy, the charting side sets types in place
+    return df.copy()
+
+
+def _section_all_files(logs, section):
+    frames = _map_logs(_log_section, logs, section)
+    df = pd.concat(frames, ignore_index=True)
+
+    # Categories differ from system to system, so concat hands back plain
+    # text for the identifier columns.  Turn them back into categoricals.
+    for column in ["CPU", "DEV", "IFACE", "TTY", "system"]:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
 
     return df
 
 
+# One system's section with the system name attached
+def _log_section(log, section):
+    path_list = log.split("/", -1)
+    system_name = path_list[2]
+
+    data = load_sections(log, [section])[section]
+
+    return data.assign(system=system_name)
+
+
+# Same as above, but for several sections at once.
+# Returns a dictionary of section name to dataframe
+# Each log is still only parsed one time: the first section that misses
+# the cache parses and stores every section of the log on disk.
+def get_sections_all_files(file_list, date, sections):
+    return {
+        section: get_section_all_files(file_list, date, section)
+        for section in sections
+    }
+
+
 # Create a dataframe of identified restarts
 def get_reboots(file_list, date):
-    system_list = []
-    df = pd.DataFrame()
-
     logs = generate_file_list(file_list, date)
-    for i in logs:
-        path_list = i.split("/", -1)
-        system_name = path_list[2]
-        system_list.append(system_name)
+    key = ("reboots", _file_states(logs))
+    df = get_frame_cache().get(key, lambda: _reboots_all_files(logs))
+
+    return df.copy()
+
+
+def _reboots_all_files(logs):
+    frames = _map_logs(_log_reboots, logs)
+    return pd.concat(frames, ignore_index=True)
+
+
+# One system's restarts with the system name attached
+def _log_reboots(log):
+    path_list = log.split("/", -1)
+    system_name = path_list[2]
+
+    reboot_listing = load_reboots(log)
 
-        rb_list = sp.rebootID(i)
-        reboot_listing = pd.DataFrame(
-            rb_list,
-            columns=["datetime", "os", "action"],
+    return reboot_listing.assign(system=str(system_name))
+
+
+#############################################################################
+# Date ranges
+#############################################################################
+# Log files are named by day of the month, so a range is loaded a day at a
+# time through the cached single day loaders above.  Rows are checked
+# against the dates asked for, which also drops a sarDD file left over from
+# an earlier month.  Each day is cut down to its share of max_points before
+# everything is put together, so long ranges stay a sensible size.  The
+# lowest and highest values in each stretch are what's kept, so peaks don't
+# get averaged away.
+
+
+# The dates from start to end (inclusive) as datetimes
+def date_range(start, end):
+    start = datetime.strptime(start[:10], "%Y-%m-%d")
+    end = datetime.strptime(end[:10], "%Y-%m-%d")
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+# Section data for every system over a range of dates
+def get_section_range(file_list, start, end, section, max_points=None):
+    days = date_range(start, end)
+    logs = [i + day.strftime("%d") for day in days for i in file_list]
+    logs = logs + [i for i in [_config("store_path")] if i]
+    key = ("range", section, start, end, max_points, _file_states(logs))
+    df = get_frame_cache().get(
+        key, lambda: _section_range(file_list, days, section, max_points)
+    )
+
+    return df.copy()
+
+
+def _section_range(file_list, days, section, max_points):
+    bucket = None
+    rollup = None
+    if max_points:
+        seconds = len(days) * 24 * 3600 / max_points
+        bucket = "%ds" % max(math.ceil(seconds), 1)
+        rollup = pick_rollup(len(days) * 24 * 3600, max_points)
+
+    frames = []
+    for day, df in _range_days(file_list, days, section, rollup):
+        if bucket is not None:
+            df = downsample(df, bucket)
+        frames.append(df)
+
+    return _concat_range(frames, section)
+
+
+# Restarts for every system over a range of dates
+def get_reboots_range(file_list, start, end):
+    days = date_range(start, end)
+    frames = [df for _, df in _range_days(file_list, days, "REBOOTS")]
+
+    return _concat_range(frames, "REBOOTS")
+
+
+# Load each day of a range in turn, handing back (day, rows from that day)
+# Days in the columnar store come from there, read in one go (the min and
+# max of the rollup given, if any), the others from the logs.  Systems
+# without either for a day are left out of it.
+def _range_days(file_list, days, section, rollup=None):
+    if not days:
+        return
+
+    stored = _stored_bases(file_list, days)
+    history = None
+    if stored:
+        history = query_section(
+            section,
+            days[0].isoformat(),
+            days[-1].isoformat(),
+            rollup=rollup,
+            stat=["min", "max"],
         )
-        reboot_listing["system"] = system_name
-        reboot_listing["system"] = reboot_listing["system"].apply(str)
-        df = pd.concat([df, reboot_listing])
-        df.reset_index(drop=True, inplace=True)
 
-    return df
+    for day in days:
+        date = day.strftime("%d")
+        from_store = stored.get(day, [])
+        bases = [
+            i
+            for i in file_list
+            if i not in from_store and os.path.exists(i + date)
+        ]
+
+        frames = []
+        if bases and section == "REBOOTS":
+            frames.append(get_reboots(bases, date))
+        elif bases:
+            frames.append(get_section_all_files(bases, date, section))
+        if from_store:
+            names = [i.split("/", -1)[2] for i in from_store]
+            frames.append(history.loc[history["system"].isin(names)])
+        if not frames:
+            continue
+
+        df = pd.concat(frames, ignore_index=True)
+        stamps = pd.to_datetime(df["datetime"])
+        on_day = (stamps >= day) & (stamps < day + timedelta(days=1))
+        if on_day.any():
+            yield day, df.loc[on_day]
 
 
-# Add some data to the LOAD section dataframe
-def load_stats(load_df):
-    load_df = set_types(load_df)
-    df = load_df.copy()
-    df["pct_plist"] = (df["runq-sz"] / df["plist-sz"]) * 100
-    df["pct_blocked"] = (df["blocked"] / df["plist-sz"]) * 100
+def _concat_range(frames, section):
+    if not frames:
+        return _empty_section(section)
+
+    df = pd.concat(frames, ignore_index=True)
+    for column in ["CPU", "DEV", "IFACE", "TTY", "system"]:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
 
     return df
 
 
+# An empty frame with the right columns for when there's nothing to show
+def _empty_section(section):
+    if section == "REBOOTS":
+        columns = ["datetime", "os", "action", "system"]
+    else:
+        columns = ["datetime"] + sp.section_headers[section].split()[2:]
+        columns = columns + list(sp.section_registry[section]["derived"])
+        columns = columns + ["system"]
+
+    return pd.DataFrame(columns=columns)
+
+
+# Cut a section down to two rows per time bucket (e.g. "5min"): the lowest
+# and the highest value of each column, like cf.minmax_indices, so peaks
+# and dips survive.  Both are stamped with the start of the bucket, which is
+# the same shape as the min and max rollups in the store.
+# Rows are kept apart by system and by any identifier column (CPU, DEV...)
+def downsample(df, bucket):
+    labels = [
+        i for i in ["system", "CPU", "DEV", "IFACE", "TTY"] if i in df.columns
+    ]
+    grouped = df.groupby(
+        labels + [pd.Grouper(key="datetime", freq=bucket)], observed=True
+    )
+    df = pd.concat(
+        [grouped.min(numeric_only=True), grouped.max(numeric_only=True)]
+    )
+    df = df.dropna(how="all").sort_index(kind="stable").reset_index()
+
+    # A bucket with a single row has the same low and high
+    df = df.drop_duplicates(ignore_index=True)
+
+    # Put the columns back in the usual order
+    columns = ["datetime"] + [i for i in df.columns if i not in ["datetime"]]
+    columns = [i for i in columns if i != "system"] + ["system"]
+    return df[columns]
+
+
+# The identifiers (CPUs, devices, interfaces...) found in a section, for the
+# selectors in the interface
+def section_keys(df, section):
+    key = sp.section_registry[section]["key"]
+    if key is None or key not in df.columns:
+        return []
+
+    return sorted_keys(df[key])
+
+
+# Distinct identifiers in order, names first and CPU numbers as numbers
+def sorted_keys(column):
+    keys = column.dropna().astype(str).unique().tolist()
+    names = sorted(i for i in keys if not i.isdigit())
+    numbers = sorted((i for i in keys if i.isdigit()), key=int)
+
+    return names + numbers
+
+
+#############################################################################
+# Columnar store
+#############################################################################
+# sar only keeps a month of sarDD files, and going back over many days
+# means parsing every one of them.  ingest.py copies the parsed logs into a
+# SQLite file (configs.store_path) instead: one table per section with a
+# column per sar field, rows tagged with the system name and time (epoch
+# seconds).  The days table records which log each system's day came from
+# and the log's mtime and size at the time.
+# A (system, day) is replaced as a whole when its log changes, so ingest
+# can be run over and over (from cron) and only redoes logs that changed.
+# The range views read a day from the store while its log is unchanged or
+# has since been reused for a later month.
+# Alongside each section, rollup tables (CPU_5m...) hold the min, max, mean
+# and 95th percentile of every column per bucket, one row per statistic
+# (the stat column).  Long ranges read the coarsest rollup that still has a
+# bucket for every point drawn, rather than every sample.
+
+# Bump this when the stored layout changes so every log gets ingested again
+STORE_VERSION = 2
+
+store_sections = list(sp.section_registry) + ["REBOOTS"]
+
+# Rollup resolutions, finest first, as the bucket size in seconds
+store_rollups = {"1m": 60, "5m": 300, "1h": 3600}
+rollup_stats = ["min", "max", "mean", "p95"]
+
+
+# Open the store for writing, creating it if needed
+def _store_connect(store):
+    os.makedirs(os.path.dirname(os.path.abspath(store)), exist_ok=True)
+    con = sqlite3.connect(store, timeout=60)
+    con.execute(
+        "CREATE TABLE IF NOT EXISTS days (system TEXT, day TEXT, path TEXT, "
+        "mtime INTEGER, size INTEGER, version INTEGER, full_fidelity INTEGER, "
+        "PRIMARY KEY (system, day))"
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS days_path ON days (path)")
+
+    return con
+
+
+# Open the store for reading, None if there isn't one
+def _store_reader(store=None):
+    store = store or _config("store_path")
+    if not store or not os.path.exists(store):
+        return None
+
+    uri = pathlib.Path(os.path.abspath(store)).as_uri() + "?mode=ro"
+    return sqlite3.connect(uri, uri=True, timeout=60)
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+# Column names of a stored section, None if it has never been stored
+def _store_columns(con, section):
+    rows = con.execute("PRAGMA table_info(%s)" % _quote(section)).fetchall()
+    if not rows:
+        return None
+
+    return [i[1] for i in rows]
+
+
+# Make sure a section's table has every column of the frame
+# Header variants (a newer sysstat adding kbavail...) just add columns.
+def _store_table(con, section, df):
+    columns = _store_columns(con, section)
+    if columns is None:
+        con.execute(
+            "CREATE TABLE %s (system TEXT, datetime INTEGER)" % _quote(section)
+        )
+        con.execute(
+            "CREATE INDEX %s ON %s (system, datetime)"
+            % (_quote(section + "_system_datetime"), _quote(section))
+        )
+        columns = ["system", "datetime"]
+
+    for column in df.columns:
+        if column in columns:
+            continue
+        kind = "REAL" if pd.api.types.is_numeric_dtype(df[column]) else "TEXT"
+        con.execute(
+            "ALTER TABLE %s ADD COLUMN %s %s"
+            % (_quote(section), _quote(column), kind)
+        )
+
+
+def _epoch(stamps):
+    return pd.to_datetime(stamps).to_numpy("datetime64[s]").astype("int64")
+
+
+# Has this log been stored as it is now
+def _store_current(con, log):
+    stat = os.stat(log)
+    row = con.execute(
+        "SELECT 1 FROM days WHERE path = ? AND mtime = ? AND size = ? "
+        "AND version = ? AND full_fidelity = ?",
+        (
+            os.path.abspath(log),
+            stat.st_mtime_ns,
+            stat.st_size,
+            STORE_VERSION,
+            int(bool(_config("full_fidelity", False))),
+        ),
+    ).fetchone()
+
+    return row is not None
+
+
+# Everything to store for a log, worked out in the parsing pool: the stat
+# of the log when read, the day it holds and {table name: rows of the day}
+# for every section and its rollups
+def _ingest_log(log):
+    stat = os.stat(log)
+    frames = load_sections(log, store_sections)
+    day = None if frames is None else _log_day(log, frames)
+    if day is None:
+        return stat, None, None
+
+    tables = {}
+    for section, df in frames.items():
+        stamps = pd.to_datetime(df["datetime"])
+        df = df.loc[(stamps >= day) & (stamps < day + timedelta(days=1))]
+        tables[section] = df
+        if section == "REBOOTS":
+            continue
+
+        for name, seconds in store_rollups.items():
+            tables[section + "_" + name] = rollup(df, section, seconds)
+
+    return stat, day, tables
+
+
+# The day a log holds: the date its rows have for the day of the month in
+# the file name.  None for an empty log.
+def _log_day(log, frames):
+    stamps = [pd.to_datetime(df["datetime"]) for df in frames.values() if len(df)]
+    if not stamps:
+        return None
+
+    days = pd.concat(stamps).dt.normalize()
+    days = days[days.dt.day == int(log[-2:])]
+    if days.empty:
+        return None
+
+    return days.max()
+
+
+# Replace a system's day in the store with what was parsed from its log
+def _store_log(con, log, stat, day, tables):
+    system_name = log.split("/", -1)[2]
+    start, end = _epoch([day, day + timedelta(days=1)])
+    with con:
+        for table, df in tables.items():
+            _store_table(con, table, df)
+            con.execute(
+                "DELETE FROM %s WHERE system = ? AND datetime >= ? AND datetime < ?"
+                % _quote(table),
+                (system_name, int(start), int(end)),
+            )
+            _store_rows(con, table, system_name, df)
+
+        con.execute(
+            "INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                system_name,
+                day.strftime("%Y-%m-%d"),
+                os.path.abspath(log),
+                stat.st_mtime_ns,
+                stat.st_size,
+                STORE_VERSION,
+                int(bool(_config("full_fidelity", False))),
+            ),
+        )
+
+
+def _store_rows(con, table, system_name, df):
+    if df.empty:
+        return
+
+    columns = ["system"] + list(df.columns)
+    values = [[system_name] * len(df), _epoch(df["datetime"]).tolist()]
+    values += [df[i].tolist() for i in df.columns[1:]]
+    con.executemany(
+        "INSERT INTO %s (%s) VALUES (%s)"
+        % (
+            _quote(table),
+            ", ".join(_quote(i) for i in columns),
+            ", ".join("?" * len(columns)),
+        ),
+        zip(*values),
+    )
+
+
+# Summarise a section into buckets of the given number of seconds
+# One row per bucket (and CPU, device...) for each of rollup_stats, which
+# goes in the stat column
+def rollup(df, section, seconds):
+    key = sp.section_registry[section]["key"]
+    labels = [key] if key in df.columns else []
+    numbers = [
+        i
+        for i in df.columns[1:]
+        if i not in labels and pd.api.types.is_numeric_dtype(df[i])
+    ]
+
+    buckets = pd.to_datetime(df["datetime"]).dt.floor("%ds" % seconds)
+    grouped = df.groupby([buckets] + [df[i] for i in labels], observed=True)[numbers]
+    summary = pd.concat(
+        {
+            "min": grouped.min(),
+            "max": grouped.max(),
+            "mean": grouped.mean(),
+            "p95": grouped.quantile(0.95),
+        },
+        names=["stat"],
+    ).reset_index()
+
+    return summary[["datetime", "stat"] + labels + numbers]
+
+
+# The coarsest rollup with at least one bucket per point over a span of
+# seconds, None when only the stored samples themselves will do
+def pick_rollup(seconds, points):
+    picked = None
+    for name, size in store_rollups.items():
+        if seconds / size >= points:
+            picked = name
+
+    return picked
+
+
+# Copy every log of the configured systems into the store
+# Logs already stored as they are now are skipped unless forced.
+# Returns the logs that were (re)stored.
+def ingest_logs(file_list, store=None, force=False):
+    store = store or _config("store_path")
+    logs = [
+        i + "%02d" % day
+        for i in file_list
+        for day in range(1, 32)
+        if os.path.exists(i + "%02d" % day)
+    ]
+
+    con = _store_connect(store)
+    try:
+        if not force:
+            logs = [i for i in logs if not _store_current(con, i)]
+
+        # Parse a pool's worth at a time so only that much is held at once
+        stored = []
+        batch = 4 * (_config("parse_workers") or os.cpu_count())
+        for first in range(0, len(logs), batch):
+            chunk = logs[first : first + batch]
+            results = _map_logs(_ingest_log, chunk)
+            for log, (stat, day, tables) in zip(chunk, results):
+                if day is not None:
+                    _store_log(con, log, stat, day, tables)
+                    stored.append(log)
+    finally:
+        con.close()
+
+    return stored
+
+
+# Section data from the store for every system (or just the ones given)
+# between two dates, inclusive.  Same layout as the log loaders: datetime,
+# the identifier column if any, the values and the system name.
+# columns picks value columns, e.g. query_section("LOAD", start, end,
+# columns=["ldavg-15"]).  Give a rollup ("1m", "5m", "1h") to read that
+# instead of every sample, the stat picks which of rollup_stats (or a list
+# of them, for a row of each).
+def query_section(
+    section,
+    start,
+    end,
+    systems=None,
+    columns=None,
+    store=None,
+    rollup=None,
+    stat="mean",
+):
+    con = _store_reader(store)
+    if con is None:
+        return _empty_section(section)
+
+    table = section if rollup is None else section + "_" + rollup
+    try:
+        df = _query_store(con, table, section, start, end, systems, columns, stat)
+    finally:
+        con.close()
+
+    if df is None:
+        return _empty_section(section)
+
+    return _concat_range([df], section)
+
+
+def _query_store(con, table, section, start, end, systems, columns, stat):
+    stored = _store_columns(con, table)
+    if stored is None:
+        return None
+
+    key = sp.section_registry.get(section, {}).get("key")
+    values = [i for i in stored if i not in ("system", "datetime", "stat", key)]
+    if columns is not None:
+        values = [i for i in values if i in columns]
+    names = ["datetime"] + ([key] if key in stored else []) + values + ["system"]
+
+    days = date_range(start, end)
+    if not days:
+        return None
+    first, last = _epoch([days[0], days[-1] + timedelta(days=1)])
+    sql = "SELECT %s FROM %s WHERE datetime >= ? AND datetime < ?" % (
+        ", ".join(_quote(i) for i in names),
+        _quote(table),
+    )
+    params = [int(first), int(last)]
+    if "stat" in stored:
+        stats = [stat] if isinstance(stat, str) else list(stat)
+        sql += " AND stat IN (%s)" % ", ".join("?" * len(stats))
+        params += stats
+    if systems is not None:
+        sql += " AND system IN (%s)" % ", ".join("?" * len(systems))
+        params += list(systems)
+    sql += " ORDER BY system, datetime, rowid"
+
+    df = pd.read_sql_query(sql, con, params=params)
+    df["datetime"] = pd.to_datetime(df["datetime"], unit="s")
+
+    # Columns from header variants the asked for days never had
+    empty = [i for i in values if df[i].isna().all()]
+    return df.drop(columns=empty) if len(df) else df
+
+
+# Which systems to read from the store for each day of a range:
+# {day: [base paths]}.  A day comes from the store if its log is unchanged
+# since it was stored, is gone, or has since been reused for another month.
+def _stored_bases(file_list, days):
+    if not days:
+        return {}
+
+    con = _store_reader()
+    if con is None:
+        return {}
+
+    try:
+        rows = con.execute(
+            "SELECT system, day, path, mtime, size, full_fidelity FROM days "
+            "WHERE day >= ? AND day <= ? AND version = ?",
+            (
+                days[0].strftime("%Y-%m-%d"),
+                days[-1].strftime("%Y-%m-%d"),
+                STORE_VERSION,
+            ),
+        ).fetchall()
+    finally:
+        con.close()
+
+    recorded = {(i[0], i[1]): i[2:] for i in rows}
+    fidelity = int(bool(_config("full_fidelity", False)))
+    stored = {}
+    for day in days:
+        for base in file_list:
+            record = recorded.get((base.split("/", -1)[2], day.strftime("%Y-%m-%d")))
+            if record is None:
+                continue
+
+            log = base + day.strftime("%d")
+            try:
+                stat = os.stat(log)
+            except OSError:
+                stored.setdefault(day, []).append(base)
+                continue
+
+            current = (os.path.abspath(log), stat.st_mtime_ns, stat.st_size, fidelity)
+            written = datetime.fromtimestamp(stat.st_mtime)
+            if record == current or not day <= written < day + timedelta(days=2):
+                stored.setdefault(day, []).append(base)
+
+    return stored
+
+
 #############################################################################
 # Backstop
 #############################################################################